@@ -1,20 +1,21 @@
 # Standard library imports
-from datetime import datetime
-import json
-from threading import Thread, Lock
-from uuid import uuid4
 import logging
 import os
+import time
 import traceback
-from clean_result import clean_result
 
 # Third-party imports
-from flask import Flask, jsonify, request, abort
+from flask import Flask, Response, jsonify, request, abort, stream_with_context
 from flask_cors import CORS
-from dateutil.parser import parse
 
 # Local imports
-from main import TripCrew
+from trip_service import (
+    ALLOWED_ORIGINS, NDJSON_CONTENT_TYPE, NDJSON_KEEP_ALIVE, PRELOAD, SSE_HEADERS,
+    SSE_KEEP_ALIVE, STREAM_HEARTBEAT_INTERVAL, STREAM_POLL_INTERVAL, batch_items, batch_step,
+    get_job, job_status, metrics_text, parse_batch, stream_cursor, stream_step, submit_batch,
+    submit_trip, warmup
+)
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
@@ -22,13 +23,7 @@ app = Flask(__name__)
 CORS(app, 
      resources={
          r"/*": {
-             "origins": [
-                 "http://localhost:3000", 
-                 "http://127.0.0.1:3000", 
-                 "https://quipitnextjs.vercel.app",
-                 "https://quipit.ai",
-                 "https://www.quipit.ai"
-             ],
+             "origins": ALLOWED_ORIGINS,
              "methods": ["GET", "POST", "OPTIONS"],
              "allow_headers": ["Content-Type", "Authorization"],
              "supports_credentials": True
@@ -43,56 +38,6 @@ logging.basicConfig(
 
 import random
 
-# In-memory dictionary to store job statuses and results
-jobs = {}
-jobs_lock = Lock()
-
-def kickoff_trip_planning(job_id, location, cities, date_range, interests):
-    """Run the trip planning process in a separate thread."""
-    try:
-        logging.info(f"Starting trip planning for job {job_id}")
-        logging.debug(f"Input parameters: location={location}, cities={cities}, "
-                     f"date_range={date_range}, interests={interests}")
-
-        trip_crew = TripCrew(location, cities, date_range, interests)
-        result = trip_crew.run()
-        
-        # Log the raw result for debugging
-        logging.debug(f"Raw result from TripCrew.run(): {result}")
-
-        # Ensure result is JSON serializable
-        if result is None:
-            result = {"message": "No result generated"}
-        
-        # Try to convert result to string if it's not already
-        if not isinstance(result, (str, dict)):
-            result = str(result)
-
-        # Clean the result before storing
-        cleaned_result = clean_result(result)
-
-        with jobs_lock:
-            jobs[job_id]["status"] = "completed"
-            jobs[job_id]["result"] = cleaned_result
-            jobs[job_id]["events"].append({
-                "timestamp": datetime.now().isoformat(),
-                "data": "Trip planning completed successfully"
-            })
-
-        logging.info(f"Successfully completed trip planning for job {job_id}")
-
-    except Exception as e:
-        error_msg = f"Error in trip planning: {str(e)}\n{traceback.format_exc()}"
-        logging.error(error_msg)
-        
-        with jobs_lock:
-            jobs[job_id]["status"] = "error"
-            jobs[job_id]["result"] = {"error": str(e)}
-            jobs[job_id]["events"].append({
-                "timestamp": datetime.now().isoformat(),
-                "data": f"Error occurred: {str(e)}"
-            })
-
 @app.route('/api/crew', methods=['POST'])
 def plan_trip():
     if request.method == 'OPTIONS':
@@ -104,57 +49,65 @@ def plan_trip():
         return response, 204
 
     try:
-        data = request.json
-        logging.info(f"Received trip planning request: {data}")
-
-        # Validate required fields
-        required_fields = ['location', 'cities', 'date_range', 'interests']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-            if not isinstance(data[field], str):
-                return jsonify({"error": f"{field} must be a string"}), 400
-
-        # Validate date range format
-        try:
-            start_date, end_date = data['date_range'].split(" to ")
-            parse(start_date)
-            parse(end_date)
-        except (ValueError, AttributeError) as e:
-            return jsonify({
-                "error": "Invalid date range format. Expected 'DD/MM/YYYY to DD/MM/YYYY'"
-            }), 400
-
-        job_id = str(uuid4())
-        
-        with jobs_lock:
-            jobs[job_id] = {
-                "status": "in_progress",
-                "result": None,
-                "events": [{
-                    "timestamp": datetime.now().isoformat(),
-                    "data": "Job started"
-                }]
-            }
-
-        thread = Thread(
-            target=kickoff_trip_planning,
-            args=(job_id, data['location'], data['cities'], 
-                  data['date_range'], data['interests'])
-        )
-        thread.start()
-
-        return jsonify({
-            "job_id": job_id,
-            "status": "Trip planning started",
-            "message": "Successfully initiated trip planning"
-        }), 202
+        payload, status_code, headers = submit_trip(request.json)
+        response = jsonify(payload)
+        response.headers.update(headers)
+        return response, status_code
 
     except Exception as e:
         error_msg = f"Error in plan_trip: {str(e)}\n{traceback.format_exc()}"
         logging.error(error_msg)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/crew/batch', methods=['POST'])
+def plan_batch():
+    """Submit many trip requests at once, as a JSON array or NDJSON lines."""
+    try:
+        trips, error = parse_batch(request.get_data(), request.content_type or "")
+        if error is not None:
+            return jsonify({"error": error}), 400
+        payload, status_code, headers = submit_batch(trips)
+        response = jsonify(payload)
+        response.headers.update(headers)
+        return response, status_code
+
+    except Exception as e:
+        error_msg = f"Error in plan_batch: {str(e)}\n{traceback.format_exc()}"
+        logging.error(error_msg)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/crew/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Stream one NDJSON line per batch item as its job finishes.
+
+    Items that are already finished (or were invalid or rejected) come
+    first; the response ends once every item has been sent.
+    """
+    items = batch_items(batch_id)
+    if items is None:
+        logging.warning(f"Batch {batch_id} not found")
+        return jsonify({"error": "Batch not found"}), 404
+
+    def generate(pending):
+        last_sent = time.monotonic()
+        while True:
+            lines = batch_step(items, pending)
+            yield from lines
+            if not pending:
+                return
+            if lines:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                yield NDJSON_KEEP_ALIVE
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    return Response(
+        stream_with_context(generate({item["index"] for item in items})),
+        mimetype=NDJSON_CONTENT_TYPE,
+        headers=SSE_HEADERS
+    )
+
 @app.route('/api/crew/<job_id>', methods=['GET'])
 def get_status(job_id):
     if request.method == 'OPTIONS':
@@ -166,30 +119,56 @@ def get_status(job_id):
         return response, 204
 
     try:
-        with jobs_lock:
-            job = jobs.get(job_id)
-
-            if job is None:
-                logging.warning(f"Job {job_id} not found")
-                return jsonify({"error": "Job not found"}), 404
-
-            logging.debug(f"Current job state for {job_id}: {job}")
-
-            response_data = {
-                "job_id": job_id,
-                "status": job["status"],
-                "result": job["result"],  # Result is already cleaned when stored
-                "events": job["events"]
-            }
-
-            logging.debug(f"Sending response for job {job_id}: {response_data}")
-            return jsonify(response_data)
+        payload, status_code, _ = job_status(job_id, request.args)
+        return jsonify(payload), status_code
 
     except Exception as e:
         error_msg = f"Error in get_status: {str(e)}\n{traceback.format_exc()}"
         logging.error(error_msg)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/crew/<job_id>/stream', methods=['GET'])
+def stream_status(job_id):
+    """Push job progress as Server-Sent Events until the job finishes.
+
+    Each job event is sent as a `progress` message whose id is its event
+    index, so a reconnecting client resumes via Last-Event-ID (or `?since=`).
+    The stream ends with a `result` message carrying the final status.
+    """
+    since = stream_cursor(request.args, request.headers)
+
+    if get_job(job_id, since=since) is None:
+        logging.warning(f"Job {job_id} not found")
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate(cursor):
+        last_sent = time.monotonic()
+        while True:
+            messages, cursor, done = stream_step(job_id, cursor)
+            yield from messages
+            if done:
+                return
+            if messages:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                yield SSE_KEEP_ALIVE
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    return Response(
+        stream_with_context(generate(since)),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Job, task, tool and token metrics in the Prometheus text format."""
+    return Response(metrics_text(), content_type=METRICS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 3000))
+    # The debug reloader runs the app in a child process; only warm that one
+    if PRELOAD and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warmup()
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,308 @@
+"""Asyncio-native serving path for the trip planning API.
+
+Exposes the same routes and JSON contract as the Flask app in api.py, as
+a plain ASGI application so it runs under any ASGI server:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 3000
+
+Handlers never block the event loop: job store and scheduler calls run in
+a thread via asyncio.to_thread, and crews run on the scheduler's own worker
+pool (or in crew_pool worker processes, see CREW_BACKEND). Between polls the
+SSE stream waits on the client's disconnect rather than holding a thread
+per connection, so it stops as soon as the client goes away.
+"""
+import asyncio
+import json
+import logging
+import time
+import traceback
+from urllib.parse import parse_qsl
+
+from trip_service import (
+    ALLOWED_ORIGINS, NDJSON_CONTENT_TYPE, NDJSON_KEEP_ALIVE, SSE_HEADERS, SSE_KEEP_ALIVE,
+    STREAM_HEARTBEAT_INTERVAL, PRELOAD, STREAM_POLL_INTERVAL, batch_items, batch_step,
+    crew_pool, get_job, job_status, metrics_text, parse_batch, scheduler, stream_cursor,
+    stream_step, submit_batch, submit_trip, warmup
+)
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+)
+
+# Largest request body accepted by POST /api/crew and POST /api/crew/batch
+MAX_BODY_BYTES = 64 * 1024
+MAX_BATCH_BODY_BYTES = 1024 * 1024
+
+_CORS_METHODS = "GET, POST, OPTIONS"
+_CORS_HEADERS = "Content-Type, Authorization"
+
+
+class _Request:
+    __slots__ = ("method", "path", "args", "headers")
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"].rstrip("/") or "/"
+        # Last value wins for repeated keys, like Flask's request.args.get
+        self.args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        self.headers = {
+            name.decode("latin-1").title(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+
+
+def _cors_headers(request):
+    origin = request.headers.get("Origin")
+    if origin not in ALLOWED_ORIGINS:
+        return []
+    return [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode("latin-1"), str(value).encode("latin-1"))
+            for name, value in headers.items()]
+
+
+async def _send_json(send, request, payload, status=200, headers=None):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + _encode_headers(headers or {}) + _cors_headers(request),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive, limit=MAX_BODY_BYTES):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise ValueError("Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def plan_trip(request, receive, send):
+    try:
+        body = await _read_body(receive)
+    except ValueError as e:
+        await _send_json(send, request, {"error": str(e)}, 413)
+        return
+    if body is None:
+        return
+    try:
+        data = json.loads(body or b"null")
+    except ValueError as e:
+        await _send_json(send, request, {"error": f"Invalid JSON body: {e}"}, 400)
+        return
+    payload, status_code, headers = await asyncio.to_thread(submit_trip, data)
+    await _send_json(send, request, payload, status_code, headers)
+
+
+async def plan_batch(request, receive, send):
+    try:
+        body = await _read_body(receive, MAX_BATCH_BODY_BYTES)
+    except ValueError as e:
+        await _send_json(send, request, {"error": str(e)}, 413)
+        return
+    if body is None:
+        return
+    trips, error = parse_batch(body, request.headers.get("Content-Type", ""))
+    if error is not None:
+        await _send_json(send, request, {"error": error}, 400)
+        return
+    payload, status_code, headers = await asyncio.to_thread(submit_batch, trips)
+    await _send_json(send, request, payload, status_code, headers)
+
+
+async def batch_status(request, receive, send, batch_id):
+    """NDJSON stream of batch items, same lines as api.batch_status."""
+    items = await asyncio.to_thread(batch_items, batch_id)
+    if items is None:
+        logging.warning(f"Batch {batch_id} not found")
+        await _send_json(send, request, {"error": "Batch not found"}, 404)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", NDJSON_CONTENT_TYPE.encode())]
+        + _encode_headers(SSE_HEADERS) + _cors_headers(request),
+    })
+    pending = {item["index"] for item in items}
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        last_sent = time.monotonic()
+        while not disconnected.done():
+            lines = await asyncio.to_thread(batch_step, items, pending)
+            if lines:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                lines = [NDJSON_KEEP_ALIVE]
+                last_sent = time.monotonic()
+            if lines or not pending:
+                await send({
+                    "type": "http.response.body",
+                    "body": "".join(lines).encode(),
+                    "more_body": bool(pending),
+                })
+            if not pending:
+                return
+            await asyncio.wait([disconnected], timeout=STREAM_POLL_INTERVAL)
+    finally:
+        disconnected.cancel()
+
+
+async def get_status(request, receive, send, job_id):
+    payload, status_code, _ = await asyncio.to_thread(job_status, job_id, request.args)
+    await _send_json(send, request, payload, status_code)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_status(request, receive, send, job_id):
+    """Server-Sent Events stream, same messages as api.stream_status."""
+    cursor = stream_cursor(request.args, request.headers)
+    if await asyncio.to_thread(get_job, job_id, cursor) is None:
+        logging.warning(f"Job {job_id} not found")
+        await _send_json(send, request, {"error": "Job not found"}, 404)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]
+        + _encode_headers(SSE_HEADERS) + _cors_headers(request),
+    })
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        last_sent = time.monotonic()
+        while not disconnected.done():
+            messages, cursor, done = await asyncio.to_thread(stream_step, job_id, cursor)
+            if messages:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                messages = [SSE_KEEP_ALIVE]
+                last_sent = time.monotonic()
+            if messages or done:
+                await send({
+                    "type": "http.response.body",
+                    "body": "".join(messages).encode(),
+                    "more_body": not done,
+                })
+            if done:
+                return
+            await asyncio.wait([disconnected], timeout=STREAM_POLL_INTERVAL)
+    finally:
+        disconnected.cancel()
+
+
+async def metrics(request, send):
+    body = metrics_text().encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", METRICS_CONTENT_TYPE.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if PRELOAD:
+                # Warm the crew (or its worker processes) before the first request
+                await asyncio.to_thread(warmup)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Let queued crews finish without blocking the event loop
+            await asyncio.to_thread(scheduler.shutdown)
+            if crew_pool is not None:
+                await asyncio.to_thread(crew_pool.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _route(parts):
+    """``(method, handler, args)`` for a /api/crew path, None if there is none."""
+    if parts[:2] != ["api", "crew"]:
+        return None
+    rest = parts[2:]
+    if not rest:
+        return "POST", plan_trip, ()
+    if rest == ["batch"]:
+        return "POST", plan_batch, ()
+    if len(rest) == 2 and rest[0] == "batch":
+        return "GET", batch_status, (rest[1],)
+    if len(rest) == 1:
+        return "GET", get_status, (rest[0],)
+    if len(rest) == 2 and rest[1] == "stream":
+        return "GET", stream_status, (rest[0],)
+    return None
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    request = _Request(scope)
+    if request.path == "/metrics" and request.method == "GET":
+        await metrics(request, send)
+        return
+    parts = request.path.strip("/").split("/")
+    route = _route(parts)
+    if route is None:
+        await _send_json(send, request, {"error": "Not found"}, 404)
+        return
+    expected, handler, args = route
+
+    if request.method == "OPTIONS":
+        # CORS preflight
+        await send({
+            "type": "http.response.start",
+            "status": 204,
+            "headers": [
+                (b"access-control-allow-methods", _CORS_METHODS.encode()),
+                (b"access-control-allow-headers", _CORS_HEADERS.encode()),
+            ] + _cors_headers(request),
+        })
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    if request.method != expected:
+        await _send_json(send, request, {"error": "Method not allowed"}, 405,
+                         {"Allow": f"{expected}, OPTIONS"})
+        return
+
+    try:
+        await handler(request, receive, send, *args)
+    except Exception as e:
+        error_msg = f"Error in {request.method} {request.path}: {str(e)}\n{traceback.format_exc()}"
+        logging.error(error_msg)
+        await _send_json(send, request, {"error": str(e)}, 500)
@@ -0,0 +1,48 @@
+"""Micro-benchmark: the AST expression engine against plain eval.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_calculator
+"""
+import timeit
+
+from tools.expression import compile_expression, evaluate, evaluate_many
+
+# Budget lines as the concierge agent tends to send them
+EXPRESSIONS = [
+    "150*7", "50*7", "1050+350", "45*3+20*3", "(120+95)*2", "1400*0.15",
+    "5000/2*10", "35*7", "12+18+25", "2400/7", "75*2*3", "1050+350+180+245",
+]
+
+
+def main(number=2000, repeat=5):
+    for expression in EXPRESSIONS:
+        assert evaluate(expression) == eval(expression), expression
+
+    def run_eval():
+        for expression in EXPRESSIONS:
+            eval(expression)
+
+    def run_uncached():
+        compile_expression.cache_clear()
+        for expression in EXPRESSIONS:
+            evaluate(expression)
+
+    def run_cached():
+        for expression in EXPRESSIONS:
+            evaluate(expression)
+
+    batch = "; ".join(EXPRESSIONS)
+
+    def run_batch():
+        evaluate_many(batch)
+
+    print(f"{len(EXPRESSIONS)} expressions per round")
+    for name, fn in (("eval", run_eval), ("ast, cold cache", run_uncached),
+                     ("ast, warm cache", run_cached), ("ast, one batch call", run_batch)):
+        best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+        print(f"{name:>20}: {best * 1e6:8.1f} us per round")
+
+
+if __name__ == "__main__":
+    main()
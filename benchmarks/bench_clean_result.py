@@ -0,0 +1,88 @@
+"""Micro-benchmark: clean_result against the previous replace/concat cleaner.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_clean_result [days]
+"""
+import random
+import re
+import sys
+import timeit
+
+from clean_result import StreamingCleaner, clean_result
+
+
+def legacy_clean_result(text):
+    """The cleaner as it was before the single-pass rewrite, kept for comparison."""
+    if isinstance(text, str):
+        cleaned_text = text.replace('#', '').replace('**', '')
+        cleaned_text = cleaned_text.replace("Daily Overview", "Daily Overview: ")
+        cleaned_text = cleaned_text.replace('\n', ' ').replace('  ', ' ')
+        parts = re.split(r'(---)', cleaned_text)
+        paragraphs = []
+        current_paragraph = ""
+        for part in parts:
+            if part == "---":
+                if current_paragraph:
+                    paragraphs.append(current_paragraph.strip())
+                current_paragraph = ""
+            else:
+                if current_paragraph:
+                    current_paragraph += " " + part.strip()
+                else:
+                    current_paragraph = part.strip()
+        if current_paragraph:
+            paragraphs.append(current_paragraph.strip())
+        final_output = '\n\n'.join(paragraphs).replace('\n\n---', '---')
+        return final_output.strip()
+    return text
+
+
+def generate_itinerary(days, seed=0):
+    """A markdown itinerary shaped like the concierge agent's output."""
+    rng = random.Random(seed)
+    words = ["museum", "harbour", "tapas", "tram", "sunset", "market", "$45", "cathedral"]
+    sections = ["# Trip Overview\n\nA **wonderful** trip.\n"]
+    for day in range(1, days + 1):
+        lines = [f"## Day {day}: Daily Overview\n"]
+        for _ in range(12):
+            sentence = " ".join(rng.choice(words) for _ in range(15))
+            lines.append(f"- **Morning**: {sentence}.\n")
+        sections.append("".join(lines))
+    sections.append("### Detailed Budget Breakdown\n" + "- Meals: $50/day\n" * 40)
+    return "\n---\n".join(sections)
+
+
+def _collapse(text):
+    # The legacy cleaner only collapsed one level of double spaces
+    return re.sub(r" {2,}", " ", text)
+
+
+def main(days=60, repeat=5):
+    text = generate_itinerary(days)
+    assert clean_result(text) == _collapse(legacy_clean_result(text))
+
+    cleaner = StreamingCleaner()
+    for i in range(0, len(text), 64):
+        cleaner.feed(text[i:i + 64])
+    cleaner.close()
+    assert cleaner.text == clean_result(text)
+
+    number = 20
+    print(f"itinerary: {days} days, {len(text):,} characters")
+    for name, fn in (("legacy", legacy_clean_result), ("clean_result", clean_result)):
+        best = min(timeit.repeat(lambda fn=fn: fn(text), number=number, repeat=repeat)) / number
+        print(f"{name:>14}: {best * 1000:8.3f} ms per call")
+
+    def streamed():
+        streaming = StreamingCleaner()
+        for i in range(0, len(text), 64):
+            streaming.feed(text[i:i + 64])
+        streaming.close()
+
+    best = min(timeit.repeat(streamed, number=number, repeat=repeat)) / number
+    print(f"{'streaming/64B':>14}: {best * 1000:8.3f} ms per call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
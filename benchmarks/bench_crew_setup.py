@@ -0,0 +1,82 @@
+"""Per-job crew setup time: precompiled templates and shared clients vs rebuilding.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_crew_setup
+
+The prompt part always runs. The agent part needs crewai and
+langchain-openai installed; building clients doesn't call the API, so a
+placeholder OPENAI_API_KEY is used if none is set.
+"""
+import os
+import timeit
+from textwrap import dedent, indent
+
+import prompts
+
+TRIP = {
+    "origin": "New York",
+    "cities": "Lisbon, Porto, Madrid",
+    "city": "Lisbon",
+    "date_range": "01/06/2025 to 07/06/2025",
+    "interests": "food, architecture, live music",
+}
+TEMPLATES = ("IDENTIFY", "GATHER", "PLAN")
+
+
+def bench_prompts(number, repeat):
+    templates = [getattr(prompts, f"{name}_TEMPLATE") for name in TEMPLATES]
+    # What the f-string + dedent call in every task method used to do
+    sources = [indent(template.text, " " * 16) for template in templates]
+    for template, source in zip(templates, sources):
+        assert dedent(source.format_map(TRIP)) == template.render(**TRIP)
+
+    def legacy():
+        for source in sources:
+            dedent(source.format_map(TRIP))
+
+    def compiled():
+        for template in templates:
+            template.render(**TRIP)
+
+    for label, fn in (("dedent per job", legacy), ("precompiled", compiled)):
+        best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+        print(f"  prompts  {label:<28} {best * 1e6:10.1f} us/job")
+
+
+def bench_agents(number, repeat):
+    try:
+        from crewai import Agent
+        import trip_agents
+    except ImportError as e:
+        print(f"  agents   skipped: {e}")
+        return
+    os.environ.setdefault("OPENAI_API_KEY", "sk-placeholder")
+    names = ("city_selection_agent", "local_expert", "travel_concierge")
+
+    def legacy():
+        # No llm= argument: crewai builds a new OpenAI client for every agent
+        for name in names:
+            spec = trip_agents.AGENT_SPECS[name]
+            Agent(role=spec["role"], goal=spec["goal"], backstory=spec["backstory"],
+                  tools=list(spec["tools"]), verbose=True)
+
+    agents = trip_agents.TripAgents()
+
+    def shared():
+        for name in names:
+            getattr(agents, name)()
+
+    for label, fn in (("new LLM client per agent", legacy), ("shared LLM client", shared)):
+        best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+        print(f"  agents   {label:<28} {best * 1e3:10.2f} ms/job")
+
+
+def main():
+    print("Per-job crew setup (identify, gather and plan):")
+    bench_prompts(number=2000, repeat=5)
+    bench_agents(number=20, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
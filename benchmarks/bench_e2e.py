@@ -0,0 +1,212 @@
+"""End-to-end benchmark: N concurrent trip jobs through api.py.
+
+Record fixtures once against the live services (needs OPENAI_API_KEY,
+SERPER_API_KEY and BROWSERLESS_API_KEY; plans each trip once):
+
+    python -m benchmarks.bench_e2e --record
+
+then replay them offline as often as needed:
+
+    python -m benchmarks.bench_e2e --jobs 40 --concurrency 8
+    REPLAY_LATENCY_SCALE=0 python -m benchmarks.bench_e2e   # no simulated latency
+
+Jobs are submitted and polled through the Flask test client, so the run
+covers validation, scheduling, the crew and the job store, but not HTTP
+serving (see load_test for that). The tool caches start empty in a
+temporary directory and the result cache, request coalescing and the city
+knowledge cache are off, so every job runs its whole crew. Reports throughput, job latency percentiles,
+peak memory and per-stage timings from each job's ``timings``.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+TRIPS = (
+    {"location": "New York", "cities": "Lisbon, Porto",
+     "date_range": "01/06/2025 to 05/06/2025", "interests": "food, architecture"},
+    {"location": "London", "cities": "Kyoto, Osaka",
+     "date_range": "10/04/2025 to 16/04/2025", "interests": "temples, gardens, street food"},
+    {"location": "Berlin", "cities": "Mexico City, Oaxaca",
+     "date_range": "02/11/2025 to 08/11/2025", "interests": "museums, markets, live music"},
+)
+
+
+def _configure(mode, fixtures):
+    """Environment for api.py; must run before it is imported."""
+    os.environ["REPLAY_MODE"] = mode
+    os.environ.setdefault("REPLAY_DIR", fixtures)
+    os.environ.setdefault("TOOL_CACHE_PATH", os.path.join(
+        tempfile.mkdtemp(prefix="bench-e2e-"), "tool_cache.sqlite3"))
+    os.environ.setdefault("RESULT_CACHE_TTL", "0")
+    os.environ.setdefault("RESULT_CACHE_COALESCE", "0")
+    # Recording plans each trip once through the full crew; with city research
+    # reused, repeat jobs would send plan_task prompts that were never recorded
+    os.environ.setdefault("CITY_KNOWLEDGE_TTL", "0")
+    if mode == "replay":
+        for name in ("OPENAI_API_KEY", "SERPER_API_KEY", "BROWSERLESS_API_KEY"):
+            os.environ.setdefault(name, "replay")
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def _max_rss_mb():
+    # ru_maxrss is in KiB on Linux; children covers CREW_BACKEND=process workers
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def _run_job(client, trip, poll_interval, timeout):
+    start = time.perf_counter()
+    response = client.post("/api/crew", json=trip)
+    if response.status_code not in (200, 202):
+        return {"status": f"http {response.status_code}", "latency": time.perf_counter() - start}
+    job_id = response.get_json()["job_id"]
+    deadline = start + timeout
+    while True:
+        # since past the end: no events, just status and timings
+        job = client.get(f"/api/crew/{job_id}?since=1000000").get_json()
+        if job["status"] != "in_progress" or time.perf_counter() > deadline:
+            break
+        time.sleep(poll_interval)
+    return {"status": job["status"], "latency": time.perf_counter() - start,
+            "timings": job.get("timings"), "usage": job.get("usage")}
+
+
+def _stages(results):
+    """Per-stage durations across jobs: queue wait, total run, time to the
+    first itinerary text, each task and each tool."""
+    stages = {}
+    for result in results:
+        timings = result.get("timings")
+        if not timings:
+            continue
+        if timings["queue_wait_s"] is not None:
+            stages.setdefault("queue_wait", []).append(timings["queue_wait_s"])
+        stages.setdefault("run", []).append(timings["run_s"])
+        if timings.get("first_output_s") is not None:
+            stages.setdefault("first_output", []).append(timings["first_output_s"])
+        for task, duration in timings["tasks"].items():
+            stages.setdefault(f"task {task}", []).append(duration)
+        for tool, stats in timings["tools"].items():
+            stages.setdefault(f"tool {tool}", []).append(stats["total_s"])
+        for upstream, wait in timings.get("rate_limit_waits", {}).items():
+            stages.setdefault(f"rate_limit {upstream}", []).append(wait["total_s"])
+    return stages
+
+
+def run(jobs, concurrency, poll_interval=0.2, timeout=1800, trace_memory=False):
+    import api
+    import trip_service
+
+    started = time.perf_counter()
+    trip_service.warmup()
+    print(f"warmup: {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    if trace_memory:
+        tracemalloc.start()
+    client = api.app.test_client()
+    lock = threading.Lock()
+    done = []
+
+    def job(index):
+        result = _run_job(client, TRIPS[index % len(TRIPS)], poll_interval, timeout)
+        with lock:
+            done.append(result)
+            print(f"  job {len(done)}/{jobs}: {result['status']} in {result['latency']:.2f}s",
+                  file=sys.stderr)
+        return result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(job, range(jobs)))
+    elapsed = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    trip_service.scheduler.shutdown()
+    if trip_service.crew_pool is not None:
+        trip_service.crew_pool.shutdown()
+
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    latencies = [result["latency"] for result in results if result["status"] == "completed"]
+    rss, children_rss = _max_rss_mb()
+    report = {
+        "jobs": jobs,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_s": round(len(latencies) / elapsed, 3),
+        "statuses": statuses,
+        "latency_s": {
+            name: round(_percentile(latencies, fraction), 3)
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        } if latencies else {},
+        "memory_mb": {
+            "max_rss": round(rss, 1),
+            "max_rss_children": round(children_rss, 1),
+            "tracemalloc_peak": None if traced_peak is None else round(traced_peak / 2 ** 20, 1),
+        },
+        "stages_s": {
+            name: {"p50": round(_percentile(values, 0.5), 3),
+                   "p95": round(_percentile(values, 0.95), 3),
+                   "max": round(max(values), 3)}
+            for name, values in sorted(_stages(results).items())
+        },
+    }
+    return report
+
+
+def _print_report(report):
+    print(f"{report['jobs']} jobs, concurrency {report['concurrency']}: "
+          f"{report['elapsed_s']:.2f}s, {report['jobs_per_s']:.2f} jobs/s")
+    print(f"statuses: {report['statuses']}")
+    if report["latency_s"]:
+        print("job latency: " + "  ".join(
+            f"{name} {value:.2f}s" for name, value in report["latency_s"].items()))
+    memory = report["memory_mb"]
+    line = f"memory: max RSS {memory['max_rss']:.1f} MB (workers {memory['max_rss_children']:.1f} MB)"
+    if memory["tracemalloc_peak"] is not None:
+        line += f", tracemalloc peak {memory['tracemalloc_peak']:.1f} MB"
+    print(line)
+    print(f"{'stage':<44}{'p50':>10}{'p95':>10}{'max':>10}")
+    for name, stats in report["stages_s"].items():
+        print(f"{name:<44}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['max']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, help="jobs to run (default: 20, one per trip with --record)")
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs in flight at once")
+    parser.add_argument("--record", action="store_true", help="call the live services and record fixtures")
+    parser.add_argument("--fixtures", default=os.path.join("benchmarks", "fixtures"),
+                        help="fixture directory (REPLAY_DIR)")
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also report the tracemalloc peak (slows the run down)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    jobs = args.jobs or (len(TRIPS) if args.record else 20)
+    _configure("record" if args.record else "replay", args.fixtures)
+    report = run(jobs, args.concurrency, args.poll_interval, trace_memory=args.tracemalloc)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Startup cost: import time of the API entry points, from ``python -X importtime``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time main trip_runner:warmup --top 15
+
+Each target is imported in a fresh interpreter. "module:function" also
+calls the function (e.g. a warmup hook) and reports its wall time. The
+heaviest top-level packages show where the time goes.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_TARGETS = ("api", "asgi", "trip_service", "main", "trip_runner:warmup")
+
+_PROBE = """
+import importlib, json, sys, time
+module_name, _, function = sys.argv[1].partition(":")
+start = time.perf_counter()
+module = importlib.import_module(module_name)
+imported = time.perf_counter()
+if function:
+    getattr(module, function)()
+print(json.dumps({"import_s": imported - start, "call_s": time.perf_counter() - imported}))
+"""
+
+
+def _parse_importtime(stderr):
+    """Cumulative microseconds per top-level package from -X importtime output."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        # Top-level entries are the ones without indentation
+        if name.startswith(" ") and not name.startswith("  "):
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(cumulative)
+    return packages
+
+
+def measure(target):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, target],
+        capture_output=True, text=True)
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+        return {"target": target, "error": error}
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    report["target"] = target
+    report["packages"] = _parse_importtime(process.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    args = parser.parse_args()
+
+    for target in args.targets:
+        report = measure(target)
+        if "error" in report:
+            print(f"{target:<22} not importable here: {report['error']}")
+            continue
+        line = f"{target:<22} import {report['import_s'] * 1000:8.1f} ms"
+        if ":" in target:
+            line += f"   call {report['call_s'] * 1000:8.1f} ms"
+        print(line)
+        heaviest = sorted(report["packages"].items(), key=lambda item: -item[1])
+        for package, micros in heaviest[:args.top]:
+            print(f"    {package:<30} {micros / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Prompt budget: tokens per task description for each prompt profile.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_prompt_budget
+
+Counts use tiktoken's cl100k_base when installed, else ~4 characters per
+token. A task's description is resent on every LLM iteration of its agent,
+so these numbers multiply by the iterations per task.
+"""
+from prompts import PROFILES, prompt_tokens
+
+TRIP = {
+    "origin": "New York",
+    "cities": "Lisbon, Porto, Madrid",
+    "city": "Lisbon",
+    "date_range": "01/06/2025 to 07/06/2025",
+    "interests": "food, architecture, live music",
+}
+# The tasks of the default sequential crew
+SEQUENTIAL_TASKS = ("identify_task", "gather_task", "plan_task")
+
+
+def main():
+    counts = {profile: prompt_tokens(profile, **TRIP) for profile in PROFILES}
+    baseline = counts[PROFILES[0]]
+    print(f"{'task':<16}" + "".join(f"{profile:>12}" for profile in PROFILES))
+    for task in baseline:
+        print(f"{task:<16}" + "".join(f"{counts[profile][task]:>12}" for profile in PROFILES))
+    print(f"{'sequential crew':<16}" + "".join(
+        f"{sum(counts[profile][task] for task in SEQUENTIAL_TASKS):>12}" for profile in PROFILES))
+    full = sum(baseline[task] for task in SEQUENTIAL_TASKS)
+    for profile in PROFILES[1:]:
+        total = sum(counts[profile][task] for task in SEQUENTIAL_TASKS)
+        print(f"{profile}: {1 - total / full:.0%} fewer prompt tokens per task iteration")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Load test for the trip planning API: requests/sec and latency percentiles.
+
+Start the server under test, then point this at it, e.g.
+
+    python api.py                                   # Flask dev server
+    uvicorn asgi:app --port 3000                    # asyncio serving path
+    python -m benchmarks.load_test http://127.0.0.1:3000 --concurrency 50
+
+A handful of jobs are submitted first; the test then hammers the status
+endpoint (what the frontend polls) and, with --submit-ratio, mixes in new
+submissions. Plain asyncio sockets keep the client out of the measurement.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+
+async def _http(host, port, method, path, body=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Connection: close\r\nContent-Length: {len(payload)}\r\n")
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        writer.write(head.encode() + b"\r\n" + payload)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    _, _, content = rest.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), content
+
+
+def _trip(index):
+    # Distinct cities per request so the result cache doesn't absorb them
+    return {
+        "location": "New York",
+        "cities": f"Load Test City {index}",
+        "date_range": "01/06/2025 to 05/06/2025",
+        "interests": "food, museums",
+    }
+
+
+def _percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+async def run(base_url, concurrency=20, duration=10.0, jobs=5, submit_ratio=0.0):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+
+    job_ids = []
+    for index in range(jobs):
+        status, content = await _http(host, port, "POST", "/api/crew", _trip(index))
+        if status in (200, 202):
+            job_ids.append(json.loads(content)["job_id"])
+    if not job_ids:
+        raise SystemExit(f"Could not submit any job to {base_url}")
+
+    latencies = []
+    statuses = {}
+    counter = iter(range(jobs, 10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if random.random() < submit_ratio:
+                    status, _ = await _http(host, port, "POST", "/api/crew", _trip(next(counter)))
+                else:
+                    path = f"/api/crew/{random.choice(job_ids)}"
+                    status, _ = await _http(host, port, "GET", path)
+            except OSError:
+                status = "connection error"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("base_url", nargs="?", default="http://127.0.0.1:3000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--submit-ratio", type=float, default=0.0,
+                        help="share of requests that submit a new trip instead of polling")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.base_url, args.concurrency, args.duration,
+                             args.jobs, args.submit_ratio))
+    print(f"{args.base_url}: {report['requests']} requests, "
+          f"concurrency {args.concurrency}, {args.duration:.0f}s")
+    print(f"  {report['requests_per_sec']:8.1f} req/s")
+    for name in ("p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        print(f"  {name[:-3]:>5}: {report[name]:8.2f} ms")
+    print(f"  statuses: {report['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import re
+from dataclasses import dataclass
+
+from dateutil.parser import parse
+
+CATEGORIES = ("Accommodation", "Meals", "Activities", "Transportation", "Miscellaneous")
+# Contingency fund suggested on top of the grand total, as a (low, high) share
+CONTINGENCY_RANGE = (0.10, 0.15)
+
+# Keywords used to file free-form budget lines under a category
+_CATEGORY_KEYWORDS = (
+    ("Accommodation", ("accommodation", "hotel", "hostel", "night", "stay", "lodging")),
+    ("Meals", ("meal", "breakfast", "lunch", "dinner", "food", "restaurant", "dining")),
+    ("Transportation", ("flight", "train", "bus", "taxi", "metro", "transport", "car rental", "transit", "airfare")),
+    ("Activities", ("activity", "activities", "tour", "ticket", "entrance", "museum", "admission", "attraction")),
+)
+
+_AMOUNT = r"[$€£]\s?((?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)"
+_CURRENCY_RE = re.compile(r"[$€£](?=\s?\d)")
+# "- Day 1 | Accommodation | Hilton, 1 night | $150 x 1", the format plan_task asks for
+_LINE_ITEM_RE = re.compile(
+    r"^\s*[-*•]?\s*Day\s*(\d+)\s*\|\s*([^|]+?)\s*\|\s*([^|]*?)\s*\|\s*" + _AMOUNT
+    + r"(?:\s*(?:x|×|\*)\s*(\d+(?:\.\d+)?))?", re.IGNORECASE)
+# "$150/night × 7 nights" in free-form lines
+_RATE_RE = re.compile(_AMOUNT + r"\s*(?:/\s*\w+)?\s*(?:x|×|\*)\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_ANY_AMOUNT_RE = re.compile(_AMOUNT)
+_DAY_RE = re.compile(r"\bDay\s*(\d+)\b", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•+]|\d+[.)])\s+")
+_TOTAL_RE = re.compile(r"\b(total|subtotal|contingency|emergency|average|per[- ]person)\b", re.IGNORECASE)
+_SECTION_RE = re.compile(r"budget line items|detailed budget breakdown", re.IGNORECASE)
+_LETTERS_RE = re.compile(r"[^\W\d_]")
+
+
+@dataclass(slots=True)
+class LineItem:
+    day: int
+    category: str
+    description: str
+    unit_cost: float
+    quantity: float = 1
+
+    @property
+    def amount(self):
+        return self.unit_cost * self.quantity
+
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+
+def _category(text):
+    lowered = text.lower()
+    for category in CATEGORIES:
+        if lowered.startswith(category.lower()):
+            return category
+    for category, keywords in _CATEGORY_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return category
+    return "Miscellaneous"
+
+
+def extract_line_items(text):
+    """Cost line items from a budget section.
+
+    Lines in the "Day N | Category | description | $cost x qty" format are
+    read exactly. Only if there are none, other lines with a dollar amount
+    are accepted as long as they aren't totals, averages or contingency
+    figures, or day subtotals (see :func:`_drop_day_subtotals`).
+    """
+    items = []
+    loose_items = []
+    for line in text.splitlines():
+        match = _LINE_ITEM_RE.match(line)
+        if match:
+            day, category, description, cost, quantity = match.groups()
+            items.append(LineItem(
+                day=int(day), category=_category(category), description=description,
+                unit_cost=_number(cost), quantity=float(quantity) if quantity else 1))
+            continue
+        if _TOTAL_RE.search(line):
+            continue
+        rate = _RATE_RE.search(line)
+        amount = _ANY_AMOUNT_RE.search(line)
+        if rate is None and amount is None:
+            continue
+        description = _BULLET_RE.sub("", line).strip()
+        day = _DAY_RE.search(line)
+        loose_items.append((LineItem(
+            day=int(day.group(1)) if day else 0,
+            category=_category(description),
+            description=description,
+            unit_cost=_number(rate.group(1) if rate else amount.group(1)),
+            quantity=float(rate.group(2)) if rate else 1), day is not None))
+    return items or _drop_day_subtotals(loose_items)
+
+
+def _is_bare_day_line(description):
+    """True for "Day 2: $300"-like lines: a day and an amount, nothing else."""
+    rest = _ANY_AMOUNT_RE.sub("", _DAY_RE.sub("", description))
+    return not _LETTERS_RE.search(rest)
+
+
+def _summed_prefix(total, items):
+    """How many of the first ``items`` add up to ``total`` (give or take rounding), or 0."""
+    running = 0.0
+    for count, item in enumerate(items, 1):
+        running += item.amount
+        if abs(running - total) <= max(0.5, total * 0.01):
+            return count
+    return 0
+
+
+def _drop_day_subtotals(entries):
+    """Loose items without the "Day N: $X" lines that sum up the items below them.
+
+    ``entries`` are (item, mentions a day) pairs. A day line followed by
+    lines without a day (or with the same day) heads a subtotal if it has
+    no description of its own, or if its amount is the sum of the first
+    of those lines. The heading is dropped and its items get its day; a
+    day line followed by nothing is an item for the whole day.
+    """
+    items = []
+    i = 0
+    while i < len(entries):
+        heading, has_day = entries[i]
+        i += 1
+        if not has_day:
+            items.append(heading)
+            continue
+        end = i
+        while end < len(entries) and (not entries[end][1] or entries[end][0].day == heading.day):
+            end += 1
+        block = [item for item, _ in entries[i:end]]
+        if block and _is_bare_day_line(heading.description):
+            covered = len(block)
+        else:
+            covered = _summed_prefix(heading.amount, block)
+        if not covered:
+            items.append(heading)
+            continue
+        for item in block[:covered]:
+            item.day = heading.day
+            items.append(item)
+        i += covered
+    return items
+
+
+def trip_days(date_range):
+    """Number of days covered by a "DD/MM/YYYY to DD/MM/YYYY" range, or None."""
+    try:
+        start, end = date_range.split(" to ")
+        days = (parse(end, dayfirst=True) - parse(start, dayfirst=True)).days + 1
+    except (ValueError, AttributeError, OverflowError):
+        return None
+    return days if days > 0 else None
+
+
+def compute_budget(items, days=None, travelers=1, currency="$"):
+    """Per-day, per-category and overall totals of ``items`` in a single pass.
+
+    Day 0 holds costs not tied to a day (flights, passes). ``days`` defaults
+    to the highest day number seen.
+    """
+    per_day = {}
+    per_category = dict.fromkeys(CATEGORIES, 0.0)
+    total = 0.0
+    last_day = 0
+    for item in items:
+        amount = item.amount
+        per_day[item.day] = per_day.get(item.day, 0.0) + amount
+        per_category[item.category] += amount
+        total += amount
+        last_day = max(last_day, item.day)
+    days = days or last_day or 1
+    low, high = CONTINGENCY_RANGE
+    return {
+        "items": [
+            {"day": item.day, "category": item.category, "description": item.description,
+             "unit_cost": item.unit_cost, "quantity": item.quantity, "amount": item.amount}
+            for item in items
+        ],
+        "per_day": [{"day": day, "total": per_day[day]} for day in sorted(per_day)],
+        "per_category": {name: value for name, value in per_category.items() if value},
+        "grand_total": total,
+        "days": days,
+        "travelers": travelers,
+        "currency": currency,
+        "per_person_per_day": total / days / travelers,
+        "contingency": [total * low, total * high],
+    }
+
+
+def _money(value, currency="$"):
+    text = f"{currency}{value:,.2f}"
+    return text[:-3] if text.endswith(".00") else text
+
+
+def _quantity(value):
+    return str(int(value)) if value == int(value) else f"{value:g}"
+
+
+def render_budget(items, summary):
+    """The "Detailed Budget Breakdown" section, with every figure computed."""
+    currency = summary["currency"]
+
+    def money(value):
+        return _money(value, currency)
+
+    lines = ["## Detailed Budget Breakdown", "", "Day-by-day expenses:"]
+    by_day = {}
+    for item in items:
+        by_day.setdefault(item.day, []).append(item)
+    for entry in summary["per_day"]:
+        day = entry["day"]
+        label = f"Day {day}" if day else "Trip-wide (not tied to a day)"
+        lines.append(f"- {label}: {money(entry['total'])}")
+        for item in by_day[day]:
+            formula = money(item.unit_cost)
+            if item.quantity != 1:
+                formula += f" × {_quantity(item.quantity)} = {money(item.amount)}"
+            lines.append(f"  - {item.category}: {item.description}, {formula}")
+    lines += ["", "Category totals:"]
+    lines += [f"- {name}: {money(value)}" for name, value in summary["per_category"].items()]
+    low, high = summary["contingency"]
+    lines += [
+        "",
+        "Overall trip budget:",
+        f"- Grand total: {money(summary['grand_total'])}",
+        f"- Per-person-per-day average: {money(summary['per_person_per_day'])} "
+        f"({summary['days']} days, {summary['travelers']} traveler(s))",
+        f"- Suggested contingency fund ({CONTINGENCY_RANGE[0]:.0%}-{CONTINGENCY_RANGE[1]:.0%}): "
+        f"{money(low)} - {money(high)}",
+    ]
+    return "\n".join(lines)
+
+
+def apply_budget(text, date_range=None, travelers=1):
+    """Replace the itinerary's budget section with a computed breakdown.
+
+    Returns the new text and the budget summary, or ``(text, None)`` when
+    the itinerary has no budget section with usable line items, or its
+    amounts are in more than one currency.
+    """
+    sections = text.split("---")
+    for index, section in enumerate(sections):
+        heading = section.strip().split("\n", 1)[0]
+        if not _SECTION_RE.search(heading):
+            continue
+        items = extract_line_items(section)
+        currencies = set(_CURRENCY_RE.findall(section))
+        if not items or len(currencies) > 1:
+            return text, None
+        summary = compute_budget(
+            items, days=trip_days(date_range), travelers=travelers,
+            currency=currencies.pop() if currencies else "$")
+        sections[index] = "\n" + render_budget(items, summary) + "\n"
+        return "---".join(sections), summary
+    return text, None
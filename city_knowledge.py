@@ -0,0 +1,123 @@
+"""Cross-job memo of city research: the identify and gather task outputs.
+
+Most trips go to the same few dozen cities in the same weeks, so the city
+selection report and the local expert's city guide are cached in the
+shared tool cache and reused by later jobs; a job with both cached only
+runs plan_task. Entries are keyed by trip month and interest category
+rather than the exact request:
+
+* selection: origin, candidate cities, month, interests, prompt profile
+* guide: chosen city, origin, month, interests, prompt profile
+
+Research is only stored when the chosen city is certain, see chosen_city.
+
+CITY_KNOWLEDGE_TTL sets their freshness (0 turns the cache off).
+"""
+import json
+import os
+import re
+import threading
+
+from dateutil.parser import parse
+
+from prompts import CHOSEN_CITY_MARKER
+from tools.disk_cache import DiskCache
+
+TTL = int(os.environ.get("CITY_KNOWLEDGE_TTL", 7 * 24 * 3600))
+MAX_BYTES = int(os.environ.get("CITY_KNOWLEDGE_MAX_BYTES", 50 * 1024 * 1024))
+
+# Word-prefix patterns per interest category; interests matching none are keyed verbatim
+INTEREST_CATEGORIES = {
+    "food": ("food", "cuisine", "restaurant", "dining", "gastronom", "wine", "coffee",
+             "cooking", "culinary"),
+    "culture": ("museum", "art", "histor", "architecture", "culture", "cultural", "temple",
+                "heritage", "theater", "theatre", "church"),
+    "nightlife": ("nightlife", r"bars?\b", r"pubs?\b", "club", "music", "concert", "party"),
+    "nature": ("nature", "hiking", "park", "garden", "beach", "mountain", "outdoor",
+               "wildlife"),
+    "shopping": ("shopping", "market", "fashion", "boutique"),
+    "sports": ("sport", "surf", "diving", r"ski(?:ing)?\b", "climbing", "cycling", "football"),
+    "wellness": (r"spas?\b", "relax", "wellness", "yoga"),
+}
+
+_CATEGORY_RES = {
+    category: re.compile(r"\b(?:" + "|".join(keywords) + ")")
+    for category, keywords in INTEREST_CATEGORIES.items()
+}
+_WHITESPACE_RE = re.compile(r"\s+")
+_CHOSEN_CITY_RE = re.compile(
+    r"^[\s#*>_-]*" + re.escape(CHOSEN_CITY_MARKER) + r"(.*)$", re.IGNORECASE | re.MULTILINE)
+
+_cache_lock = threading.Lock()
+_cache = None
+
+
+def knowledge_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache("city_knowledge", ttl=TTL, max_bytes=MAX_BYTES)
+        return _cache
+
+
+def _normalize(text):
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def interest_categories(interests):
+    """``interests`` as a sorted, "+"-joined list of categories."""
+    text = _normalize(interests)
+    matched = sorted(
+        category for category, pattern in _CATEGORY_RES.items() if pattern.search(text))
+    return "+".join(matched) or text
+
+
+def _trip_key(kind, date_range, interests, profile, **parts):
+    try:
+        month = parse(date_range.split(" to ")[0], dayfirst=True).month
+    except (ValueError, OverflowError):
+        return None
+    return json.dumps(dict(
+        parts, kind=kind, month=month, interests=interest_categories(interests),
+        profile=profile), sort_keys=True)
+
+
+def selection_key(origin, cities, date_range, interests, profile):
+    candidates = sorted({_normalize(city) for city in cities.split(",") if city.strip()})
+    return _trip_key("selection", date_range, interests, profile,
+                     origin=_normalize(origin), cities=candidates)
+
+
+def guide_key(city, origin, date_range, interests, profile):
+    # gather_task is prompted with the origin too
+    return _trip_key("guide", date_range, interests, profile,
+                     city=_normalize(city), origin=_normalize(origin))
+
+
+def chosen_city(report, candidates):
+    """The candidate the selection report chose: the only one, else the one
+    named on its "Chosen city:" line, None if that is missing or ambiguous.
+
+    Counting mentions isn't good enough: a report comparing two cities at
+    length would file one city's guide under the other's key.
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+    match = _CHOSEN_CITY_RE.search(report)
+    if match is None:
+        return None
+    named = [city for city in candidates
+             if re.search(rf"\b{re.escape(city)}\b", match.group(1), re.IGNORECASE)]
+    return named[0] if len(named) == 1 else None
+
+
+def get(key):
+    if key is None or TTL <= 0:
+        return None
+    return knowledge_cache().get(key)
+
+
+def put(key, value):
+    if key is None or TTL <= 0:
+        return
+    knowledge_cache().set(key, value)
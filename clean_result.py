@@ -1,42 +1,137 @@
-import random
 import re
+from collections import deque
+
+# Runs of two or more spaces; the literal prefix keeps the regex scan fast
+_SPACES_RE = re.compile(r"  +")
+
+
+def _strip_markup(text):
+    # '#' goes first so that e.g. "*#*" collapses to "**" and is removed too
+    return text.replace('#', '').replace('**', '')
+
+
+def _flatten(text):
+    """Give "Daily Overview" a colon and collapse every whitespace run to one space."""
+    text = text.replace("Daily Overview", "Daily Overview: ")
+    text = text.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
+    return _SPACES_RE.sub(' ', text)
+
 
 def clean_result(text):
     """Clean the result by removing unnecessary newlines and formatting the text based on `---` for new paragraphs."""
     if isinstance(text, str):
-        # Remove all instances of '#' and '**'
-        cleaned_text = text.replace('#', '').replace('**', '')
+        # Remove '#' and '**', then treat each `---` separated section as a paragraph
+        # with all line breaks and repeated whitespace collapsed to single spaces
+        parts = _flatten(_strip_markup(text)).split('---')
+        return '\n\n'.join(paragraph for paragraph in map(str.strip, parts) if paragraph)
 
-        # Ensure "Overview" starts from a new line (replacing it with a space for now, since we'll remove \n)
-        cleaned_text = cleaned_text.replace("Daily Overview", "Daily Overview: ")
+    return text
+
+
+class StreamingCleaner:
+    """Incremental :func:`clean_result` for text that arrives in chunks.
 
-        # Replace all `\n` with spaces to remove line breaks completely
-        cleaned_text = cleaned_text.replace('\n', ' ').replace('  ', ' ')  # Replace double spaces after removal
+    ``feed`` returns the paragraphs completed by the new chunk (a paragraph
+    is complete once the `---` after it has arrived) and ``close`` flushes
+    the last one. Joining every returned paragraph with blank lines gives
+    exactly ``clean_result`` of the concatenated input.
+    """
 
-        # Split the cleaned text by the `---` pattern (indicating new days or sections)
-        parts = re.split(r'(---)', cleaned_text)
+    def __init__(self):
+        self.paragraphs = []
+        self._pending = []  # markup-free text after the last `---`
+        self._tail = ""  # last two pending characters, to spot a `---` split across chunks
+        self._held_star = ""  # a trailing '*' that may pair with the next chunk
 
-        # Group the parts back together, ensuring that each section after `---` starts as a new paragraph
-        paragraphs = []
-        current_paragraph = ""
+    def feed(self, chunk):
+        text = self._held_star + chunk.replace('#', '')
+        trailing_stars = len(text) - len(text.rstrip('*'))
+        if trailing_stars % 2:
+            text, self._held_star = text[:-1], '*'
+        else:
+            self._held_star = ""
+        text = text.replace('**', '')
+        probe = self._tail + text
+        self._tail = probe[-2:]
+        if '---' not in probe:
+            # Nothing completed; avoid re-joining the pending paragraph per chunk
+            self._pending.append(text)
+            return []
+        *complete, rest = (''.join(self._pending) + text).split('---')
+        self._pending = [rest]
+        self._tail = rest[-2:]
+        return self._emit(complete)
+
+    def close(self):
+        parts = [''.join(self._pending) + self._held_star]
+        self._pending = []
+        self._tail = self._held_star = ""
+        return self._emit(parts)
+
+    def _emit(self, parts):
+        new = []
         for part in parts:
-            if part == "---":
-                if current_paragraph:
-                    paragraphs.append(current_paragraph.strip())  # Append current paragraph before new section
-                current_paragraph = ""  # Reset paragraph after `---`
-            else:
-                # Handle cases where "Day" is at the beginning of a new section
-                if current_paragraph:
-                    current_paragraph += " " + part.strip()
-                else:
-                    current_paragraph = part.strip()
-
-        if current_paragraph:
-            paragraphs.append(current_paragraph.strip())
-
-        # Join paragraphs with double newlines, but ensure no extra newline comes before a new "Day"
-        final_output = '\n\n'.join(paragraphs).replace('\n\n---', '---')  # Ensure no extra newline before "Day"
-
-        return final_output.strip()
-    
-    return text
+            paragraph = _flatten(part).strip()
+            if paragraph:
+                new.append(paragraph)
+        self.paragraphs.extend(new)
+        return new
+
+    @property
+    def text(self):
+        """Everything cleaned so far."""
+        return '\n\n'.join(self.paragraphs)
+
+    @property
+    def pending_text(self):
+        """The paragraph still being received, cleaned as far as it goes."""
+        return _flatten(''.join(self._pending)).strip()
+
+
+class PartialResult:
+    """Cleaned view of a result that is still being generated, bounded in size.
+
+    Raw text is cleaned incrementally by a :class:`StreamingCleaner`.
+    Completed paragraphs go into a ring buffer holding at most
+    ``max_chars`` characters; the oldest are dropped first and counted in
+    ``first_paragraph``, so paragraph indices stay stable for clients
+    reading only the new ones.
+    """
+
+    def __init__(self, max_chars=32 * 1024):
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self._cleaner = StreamingCleaner()
+        self.paragraphs = deque()
+        self.first_paragraph = 0
+        self.chars = 0
+        self.received = 0
+
+    def feed(self, chunk):
+        self.received += len(chunk)
+        for paragraph in self._cleaner.feed(chunk):
+            self.paragraphs.append(paragraph)
+            self.chars += len(paragraph)
+            while self.chars > self.max_chars and len(self.paragraphs) > 1:
+                self.chars -= len(self.paragraphs.popleft())
+                self.first_paragraph += 1
+        # Only the ring buffer keeps paragraphs
+        self._cleaner.paragraphs.clear()
+
+    def to_dict(self):
+        return {
+            "paragraphs": list(self.paragraphs),
+            "first_paragraph": self.first_paragraph,
+            "pending": self._cleaner.pending_text[-self.max_chars:],
+            "received_chars": self.received,
+        }
+
+
+def clean_result_stream(chunks):
+    """Yield cleaned paragraphs from an iterable of raw text chunks as they complete."""
+    cleaner = StreamingCleaner()
+    for chunk in chunks:
+        yield from cleaner.feed(chunk)
+    yield from cleaner.close()
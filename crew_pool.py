@@ -0,0 +1,238 @@
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised when a worker process dies or times out in the middle of a job."""
+
+
+class CrewJobError(RuntimeError):
+    """Raised in the API process for an exception raised by a job in a worker."""
+
+    def __init__(self, message, remote_traceback=""):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+
+
+def _preload(names):
+    """Import each "module" or "module:function" name, calling the function."""
+    for name in names:
+        module_name, _, function = name.partition(":")
+        module = importlib.import_module(module_name)
+        if function:
+            getattr(module, function)()
+
+
+def _worker_main(conn, preload):
+    """Worker process loop: run (fn, args) jobs sent over ``conn`` until told to stop."""
+    # Ctrl-C goes to the whole process group; let the API process shut us down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _preload(preload)
+    # Events come from any thread of the job (task graph nodes, step and
+    # token callbacks); a Connection must not be written concurrently
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def send_event(event):
+        send(("event", event))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            result = fn(*args, on_event=send_event)
+        except Exception as e:
+            send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+        else:
+            send(("result", result))
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "jobs_done")
+
+    def __init__(self, context, preload):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, preload),
+            name="trip-crew-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class CrewProcessPool:
+    """Run crew jobs in a warm pool of worker processes.
+
+    Workers run ``preload`` ("module" or "module:function" names; by
+    default trip_runner's warmup, which imports crewai and langchain) once
+    at startup, so jobs don't pay for it. Progress events stream back over a
+    pipe while the job runs. A worker is replaced after
+    ``max_jobs_per_worker`` jobs to cap memory growth, and immediately if
+    it dies or exceeds ``job_timeout``, in which case the job fails with
+    :class:`WorkerCrashedError` and the API process carries on. A worker
+    whose job was abandoned for any other reason (e.g. ``on_event``
+    raised) is replaced too, as its pipe still holds that job's messages.
+
+    :meth:`run` blocks the calling thread until the job is done, so the
+    pool is meant to sit behind the JobScheduler with the same size.
+    """
+
+    def __init__(self, size=4, max_jobs_per_worker=20, job_timeout=None,
+                 preload=("trip_runner:warmup",), start_method="spawn"):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.job_timeout = job_timeout
+        self.preload = tuple(preload)
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._counts = {
+            "jobs": 0, "failed": 0, "crashed": 0, "aborted": 0, "died_idle": 0, "recycled": 0}
+
+    def start(self):
+        """Spawn the workers; called on first use if not called before."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for _ in range(self.size):
+                self._idle.put(_Worker(self._context, self.preload))
+        logging.info(f"Started {self.size} crew worker processes")
+
+    def run(self, fn, args, on_event=None):
+        """Run ``fn(*args, on_event=...)`` in a worker and return its result.
+
+        ``fn`` must be an importable top-level function and its arguments,
+        events and result picklable.
+        """
+        self.start()
+        worker = self._idle.get()
+        try:
+            if not worker.process.is_alive():
+                # Died while idle, not in this job
+                worker = self._replace(worker, "died_idle")
+            worker.conn.send((fn, args))
+            worker.jobs_done += 1
+            result = self._collect(worker, on_event)
+            self._count("jobs")
+            return result
+        except WorkerCrashedError:
+            self._count("crashed")
+            worker.process.kill()
+            worker = self._replace(worker)
+            raise
+        except CrewJobError:
+            self._count("failed")
+            raise
+        except BaseException:
+            # The rest of the job's events and result are still in the pipe
+            worker.process.kill()
+            worker = self._replace(worker, "aborted")
+            raise
+        finally:
+            if worker.jobs_done >= self.max_jobs_per_worker:
+                worker = self._replace(worker, "recycled")
+            if self._closed:
+                worker.stop()
+            else:
+                self._idle.put(worker)
+
+    def _collect(self, worker, on_event):
+        deadline = None if self.job_timeout is None else time.monotonic() + self.job_timeout
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            ready = wait([worker.conn, worker.process.sentinel], timeout)
+            if not ready:
+                raise WorkerCrashedError(
+                    f"Crew job exceeded {self.job_timeout}s in worker {worker.process.pid}")
+            if worker.conn not in ready:
+                raise self._crashed(worker)
+            try:
+                message = worker.conn.recv()
+            except EOFError:
+                raise self._crashed(worker) from None
+            kind = message[0]
+            if kind == "event":
+                if on_event is not None:
+                    on_event(message[1])
+            elif kind == "result":
+                return message[1]
+            else:
+                raise CrewJobError(message[1], message[2])
+
+    @staticmethod
+    def _crashed(worker):
+        worker.process.join(1)
+        return WorkerCrashedError(
+            f"Crew worker {worker.process.pid} exited with code {worker.process.exitcode}")
+
+    def _replace(self, worker, reason=None):
+        if reason is not None:
+            self._count(reason)
+        logging.info(f"Replacing crew worker {worker.process.pid} ({reason or 'crashed'})")
+        worker.stop(timeout=0 if not worker.process.is_alive() else 5)
+        return _Worker(self._context, self.preload)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, workers=self.size, idle=self._idle.qsize())
+
+    def shutdown(self):
+        """Stop idle workers now and busy ones as soon as their job finishes."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+
+def crew_pool_from_env():
+    """A process pool if CREW_BACKEND=process, otherwise None (crews run in threads).
+
+    Sized by CREW_MAX_WORKERS like the scheduler; workers are recycled
+    after CREW_WORKER_MAX_JOBS jobs and jobs killed after CREW_JOB_TIMEOUT
+    seconds, if set.
+    """
+    if os.environ.get("CREW_BACKEND", "thread").lower() != "process":
+        return None
+    timeout = os.environ.get("CREW_JOB_TIMEOUT")
+    return CrewProcessPool(
+        size=int(os.environ.get("CREW_MAX_WORKERS", 4)),
+        max_jobs_per_worker=int(os.environ.get("CREW_WORKER_MAX_JOBS", 20)),
+        job_timeout=float(timeout) if timeout else None,
+        start_method=os.environ.get("CREW_START_METHOD", "spawn"),
+    )
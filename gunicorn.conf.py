@@ -0,0 +1,14 @@
+"""gunicorn settings, picked up by ``gunicorn api:app`` from the working directory.
+
+The Flask dev server and the ASGI lifespan warm the crew up themselves;
+under gunicorn each worker does it right after it is forked, so no worker
+serves its first jobs cold and no crew_pool is shared between workers.
+"""
+
+
+def post_fork(server, worker):
+    from trip_service import PRELOAD, warmup
+
+    if PRELOAD:
+        server.log.info(f"Warming up worker {worker.pid}")
+        warmup()
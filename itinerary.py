@@ -0,0 +1,249 @@
+import re
+from dataclasses import asdict, dataclass, field
+
+_URL_RE = re.compile(r"https?://[^\s)\]>\"']+")
+_PRICE_RE = re.compile(r"[$€£]\s?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?")
+_DAY_RE = re.compile(r"\bDay\s*(\d+)\b", re.IGNORECASE)
+_DAY_HEADING_RE = re.compile(r"^[\s#*>_]*Day\s*(\d+)\b", re.IGNORECASE | re.MULTILINE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•+]|\d+[.)])\s+")
+_MARKUP_RE = re.compile(r"[#*_`]+")
+
+# Section headings requested by plan_task, mapped to Itinerary fields
+SECTION_KEYWORDS = (
+    ("accommodations", ("accommodation option",)),
+    ("logistics", ("logistics option",)),
+    ("budget", ("budget breakdown", "budget line items")),
+    ("flights", ("flight pricing",)),
+    ("weather", ("weather forecast and packing", "packing suggestion")),
+    ("restaurants", ("restaurant reservation",)),
+)
+FIELDS = ("overview", "days", "accommodations", "logistics", "budget",
+          "budget_summary", "flights", "weather", "restaurants")
+
+
+@dataclass(slots=True)
+class Day:
+    number: int
+    title: str
+    items: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Accommodation:
+    name: str
+    day: int | None = None
+    price: str | None = None
+    url: str | None = None
+
+
+@dataclass(slots=True)
+class LogisticsOption:
+    # Either may be empty, which to_dict drops; from_dict relies on the defaults
+    mode: str = ""
+    description: str = ""
+    price: str | None = None
+    url: str | None = None
+
+
+@dataclass(slots=True)
+class BudgetLine:
+    description: str = ""
+    amount: float | None = None
+    day: int | None = None
+    category: str | None = None
+
+
+@dataclass(slots=True)
+class Flight:
+    description: str
+    price: str | None = None
+    url: str | None = None
+
+
+@dataclass(slots=True)
+class Restaurant:
+    description: str
+    day: int | None = None
+    url: str | None = None
+
+
+@dataclass(slots=True)
+class Itinerary:
+    overview: str = ""
+    days: list = field(default_factory=list)
+    accommodations: list = field(default_factory=list)
+    logistics: list = field(default_factory=list)
+    budget: list = field(default_factory=list)
+    # Totals computed by budget.compute_budget, when line items were found
+    budget_summary: dict = field(default_factory=dict)
+    flights: list = field(default_factory=list)
+    weather: list = field(default_factory=list)
+    restaurants: list = field(default_factory=list)
+
+    def to_dict(self, fields=None, day_offset=0, day_limit=None):
+        """Compact JSON-ready dict: empty values are dropped.
+
+        ``fields`` restricts the output to those top-level fields and
+        ``day_offset`` / ``day_limit`` page through ``days``.
+        """
+        data = {}
+        for name in fields or FIELDS:
+            value = getattr(self, name)
+            if name == "days":
+                end = None if day_limit is None else day_offset + day_limit
+                value = value[day_offset:end]
+            if isinstance(value, list):
+                value = [_compact(asdict(item)) if not isinstance(item, str) else item
+                         for item in value]
+            if value:
+                data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            overview=data.get("overview", ""),
+            days=[Day(**d) for d in data.get("days", [])],
+            accommodations=[Accommodation(**a) for a in data.get("accommodations", [])],
+            logistics=[LogisticsOption(**o) for o in data.get("logistics", [])],
+            budget=[BudgetLine(**b) for b in data.get("budget", [])],
+            budget_summary=dict(data.get("budget_summary", {})),
+            flights=[Flight(**f) for f in data.get("flights", [])],
+            weather=list(data.get("weather", [])),
+            restaurants=[Restaurant(**r) for r in data.get("restaurants", [])],
+        )
+
+
+def _compact(item):
+    return {key: value for key, value in item.items() if value not in (None, "", [])}
+
+
+def _plain(text):
+    return _MARKUP_RE.sub("", text).strip()
+
+
+def _bullets(text):
+    """Bullet and numbered lines of a section, without their markers."""
+    lines = []
+    continuing = False
+    for line in text.splitlines():
+        if _BULLET_RE.match(line):
+            line = _plain(_BULLET_RE.sub("", line, count=1))
+            if line:
+                lines.append(line)
+            continuing = bool(line)
+        elif continuing and line.strip() and not line.lstrip().startswith("#"):
+            # Continuation of a wrapped bullet, e.g. a URL on its own line
+            lines[-1] += " " + _plain(line)
+        else:
+            continuing = False
+    return lines
+
+
+def _url(text):
+    match = _URL_RE.search(text)
+    return match.group(0).rstrip(".,") if match else None
+
+
+def _price(text):
+    match = _PRICE_RE.search(text)
+    return match.group(0) if match else None
+
+
+def _day(text):
+    match = _DAY_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+def _amount(text):
+    """Last dollar figure on a budget line, i.e. the result of its calculation."""
+    prices = _PRICE_RE.findall(text)
+    if not prices:
+        return None
+    return float(re.sub(r"[^\d.]", "", prices[-1]))
+
+
+def _section_kind(text):
+    heading = _plain(text.strip().split("\n", 1)[0]).lower()
+    for kind, keywords in SECTION_KEYWORDS:
+        if any(keyword in heading for keyword in keywords):
+            return kind
+    # Headings are sometimes preceded by a blank line or a short lead-in
+    head = text[:200].lower()
+    for kind, keywords in SECTION_KEYWORDS:
+        if any(keyword in head for keyword in keywords):
+            return kind
+    return None
+
+
+def _parse_days(text):
+    """Split a block of the daily plan on its "Day N" headings.
+
+    Returns the text before the first heading and the parsed days.
+    """
+    headings = list(_DAY_HEADING_RE.finditer(text))
+    preamble = text[:headings[0].start()] if headings else text
+    days = []
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        block = text[match.start():end]
+        title, _, body = block.strip().partition("\n")
+        days.append(Day(
+            number=int(match.group(1)),
+            title=_plain(title),
+            items=_bullets(body) or [_plain(line) for line in body.splitlines() if line.strip()],
+        ))
+    return preamble, days
+
+
+def parse_itinerary(text):
+    """Parse the concierge's markdown itinerary into an :class:`Itinerary`.
+
+    Sections are split on `---` and recognized by the headings plan_task
+    asks for; anything before the first day is the overview. Unrecognized
+    sections are ignored, so partial or oddly formatted output still
+    yields whatever could be recognized.
+    """
+    itinerary = Itinerary()
+    overview = []
+    for section in text.split("---"):
+        if not section.strip():
+            continue
+        kind = _section_kind(section)
+        if kind is None:
+            preamble, days = _parse_days(section)
+            if not itinerary.days and preamble.strip():
+                overview.append(_plain(preamble))
+            itinerary.days.extend(days)
+            continue
+        lines = _bullets(section)
+        if kind == "accommodations":
+            itinerary.accommodations.extend(
+                Accommodation(name=line, day=_day(line), price=_price(line), url=_url(line))
+                for line in lines)
+        elif kind == "logistics":
+            for line in lines:
+                # "Mode: description", unless the only colon is a URL's
+                url = _URL_RE.search(line)
+                head = line if url is None else line[:url.start()]
+                mode, colon, description = head.partition(":")
+                if colon:
+                    description += line[len(head):]
+                else:
+                    mode, description = "", line
+                itinerary.logistics.append(LogisticsOption(
+                    mode=mode.strip(), description=description.strip(),
+                    price=_price(line), url=_url(line)))
+        elif kind == "budget":
+            itinerary.budget.extend(
+                BudgetLine(description=line, amount=_amount(line)) for line in lines)
+        elif kind == "flights":
+            itinerary.flights.extend(
+                Flight(description=line, price=_price(line), url=_url(line)) for line in lines)
+        elif kind == "weather":
+            itinerary.weather.extend(lines)
+        elif kind == "restaurants":
+            itinerary.restaurants.extend(
+                Restaurant(description=line, day=_day(line), url=_url(line)) for line in lines)
+    itinerary.overview = " ".join(" ".join(overview).split())
+    return itinerary
@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+def _event(data):
+    """Timestamped event from a message string or a dict of event fields."""
+    if isinstance(data, dict):
+        return {"timestamp": datetime.now().isoformat(), **data}
+    return {"timestamp": datetime.now().isoformat(), "data": data}
+
+
+class InMemoryJobStore:
+    """Process-local job store with TTL and LRU eviction.
+
+    Jobs are spread over ``shards`` independently locked buckets so status
+    polling for one job doesn't contend with workers writing to another.
+    Each shard holds at most ``max_jobs / shards`` jobs; jobs untouched for
+    ``ttl`` seconds are dropped lazily. Jobs still in progress are never
+    evicted for space, so a shard may briefly exceed its capacity.
+    """
+
+    def __init__(self, max_jobs=1000, ttl=24 * 3600, shards=16):
+        self.ttl = ttl
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._shard_capacity = max(1, max_jobs // shards)
+
+    def _shard(self, job_id):
+        index = hash(job_id) % len(self._shards)
+        return self._shards[index], self._locks[index]
+
+    def _evict_locked(self, shard):
+        # Entries are kept in the order they were touched, oldest first
+        cutoff = time.time() - self.ttl
+        excess = len(shard) - self._shard_capacity
+        victims = []
+        for job_id, (touched, record) in shard.items():
+            expired = touched < cutoff
+            if not expired and excess <= 0:
+                break
+            if expired or record.get("status") != "in_progress":
+                victims.append(job_id)
+                excess -= 1
+        for job_id in victims:
+            del shard[job_id]
+
+    def create(self, job_id, record):
+        shard, lock = self._shard(job_id)
+        record = dict(record)
+        record.setdefault("events", [])
+        with lock:
+            shard[job_id] = (time.time(), record)
+            self._evict_locked(shard)
+
+    def get(self, job_id, since=0):
+        """Return a snapshot of the job, safe to serialize outside the lock.
+
+        Only events from index ``since`` on are included; ``event_count`` is
+        the total number of events so far.
+        """
+        shard, lock = self._shard(job_id)
+        with lock:
+            entry = shard.get(job_id)
+            if entry is None:
+                return None
+            touched, record = entry
+            now = time.time()
+            if touched < now - self.ttl:
+                del shard[job_id]
+                return None
+            # Keep the LRU order and the touch times in step for _evict_locked
+            shard[job_id] = (now, record)
+            shard.move_to_end(job_id)
+            snapshot = dict(record)
+            snapshot["events"] = record["events"][since:]
+            snapshot["event_count"] = len(record["events"])
+            return snapshot
+
+    def update(self, job_id, event=None, **fields):
+        """Merge ``fields`` into the job and optionally append an event."""
+        shard, lock = self._shard(job_id)
+        with lock:
+            entry = shard.get(job_id)
+            if entry is None:
+                return False
+            record = entry[1]
+            record.update(fields)
+            if event is not None:
+                record["events"].append(_event(event))
+            shard[job_id] = (time.time(), record)
+            shard.move_to_end(job_id)
+            return True
+
+    def append_event(self, job_id, data):
+        return self.update(job_id, event=data)
+
+    def delete(self, job_id):
+        shard, lock = self._shard(job_id)
+        with lock:
+            shard.pop(job_id, None)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+
+class SQLiteJobStore:
+    """Job store backed by a SQLite file, shared by every worker process.
+
+    WAL mode lets status reads proceed while a worker is writing. Each
+    thread gets its own connection. Expired jobs and jobs over
+    ``max_jobs`` (never ones in progress) are purged at most every
+    ``purge_interval`` seconds, on a create.
+    """
+
+    def __init__(self, path, max_jobs=10000, ttl=7 * 24 * 3600, purge_interval=60,
+                 table="jobs", events_table="job_events"):
+        self.path = path
+        # Other records (batches) live in tables of their own in the same file
+        self.table = table
+        self.events_table = events_table
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    job_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.events_table} (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )""")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_updated_at ON {self.table} (updated_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _purge_due(self):
+        with self._purge_lock:
+            now = time.monotonic()
+            if now - self._last_purge < self.purge_interval:
+                return False
+            self._last_purge = now
+            return True
+
+    def _purge(self, conn):
+        cutoff = time.time() - self.ttl
+        conn.execute(f"""
+            DELETE FROM {self.table} WHERE updated_at < ? OR job_id IN (
+                SELECT job_id FROM {self.table}
+                WHERE json_extract(data, '$.status') IS NOT 'in_progress'
+                ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )""", (cutoff, self.max_jobs))
+        conn.execute(
+            f"DELETE FROM {self.events_table} WHERE job_id NOT IN (SELECT job_id FROM {self.table})")
+
+    def create(self, job_id, record):
+        record = dict(record)
+        events = record.pop("events", [])
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(record), time.time()))
+            conn.execute(f"DELETE FROM {self.events_table} WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                f"INSERT INTO {self.events_table} (job_id, seq, event) VALUES (?, ?, ?)",
+                [(job_id, seq, json.dumps(e)) for seq, e in enumerate(events)])
+            if self._purge_due():
+                self._purge(conn)
+
+    def get(self, job_id, since=0):
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT data, updated_at FROM {self.table} WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        record = json.loads(row[0])
+        record["events"] = [
+            json.loads(e) for (e,) in conn.execute(
+                f"SELECT event FROM {self.events_table} WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                (job_id, since))
+        ]
+        record["event_count"] = conn.execute(
+            f"SELECT COUNT(*) FROM {self.events_table} WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return record
+
+    def update(self, job_id, event=None, **fields):
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so concurrent merges don't interleave
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT data FROM {self.table} WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            record = json.loads(row[0])
+            record.update(fields)
+            conn.execute(
+                f"UPDATE {self.table} SET data = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(record), time.time(), job_id))
+            if event is not None:
+                conn.execute(f"""
+                    INSERT INTO {self.events_table} (job_id, seq, event)
+                    SELECT ?, COALESCE(MAX(seq) + 1, 0), ? FROM {self.events_table} WHERE job_id = ?
+                    """, (job_id, json.dumps(_event(event)), job_id))
+        return True
+
+    def append_event(self, job_id, data):
+        return self.update(job_id, event=data)
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE job_id = ?", (job_id,))
+            conn.execute(f"DELETE FROM {self.events_table} WHERE job_id = ?", (job_id,))
+
+    def __len__(self):
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+def job_store_from_env(table="jobs", events_table="job_events"):
+    """Build the job store selected by JOB_STORE ("memory" or "sqlite").
+
+    Records other than jobs (batches) get a store of their own, in its own
+    SQLite tables, so they don't share the jobs' ids or eviction.
+    """
+    backend = os.environ.get("JOB_STORE", "memory")
+    max_jobs = int(os.environ.get("JOB_STORE_MAX_JOBS", 1000))
+    ttl = int(os.environ.get("JOB_STORE_TTL", 24 * 3600))
+    if backend == "sqlite":
+        path = os.environ.get("JOB_STORE_PATH", "jobs.sqlite3")
+        return SQLiteJobStore(
+            path, max_jobs=max_jobs, ttl=ttl, table=table, events_table=events_table)
+    if backend != "memory":
+        raise ValueError(f"Unknown JOB_STORE backend: {backend}")
+    return InMemoryJobStore(max_jobs=max_jobs, ttl=ttl)
@@ -0,0 +1,56 @@
+import os
+import threading
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def get_llm(model=None, temperature=None, streaming=False):
+    """Shared chat model client for ``model`` (default OPENAI_MODEL_NAME, as crewai).
+
+    One client per (model, temperature, streaming) per process, so agents
+    reuse its HTTP connection pool instead of each building a client of
+    their own. A streaming client passes its tokens to the job's
+    token_stream sink as they are generated. Requests are throttled by
+    the process-wide "openai" rate limiter.
+    """
+    model = model or os.environ.get("OPENAI_MODEL_NAME", "gpt-4")
+    key = (model, temperature, streaming)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build(model, temperature, streaming)
+        return client
+
+
+def _build(model, temperature, streaming):
+    import replay
+    callbacks = None
+    if streaming:
+        from token_stream import callback_handler
+        callbacks = [callback_handler()]
+    client = None
+    # Replay needs no API key, so the real client isn't built at all
+    if replay.MODE != "replay":
+        from langchain_openai import ChatOpenAI
+        from rate_limit import httpx_client
+        # Every OpenAI request, retries included, goes through the "openai" limiter
+        options = {"model": model, "http_client": httpx_client("openai")}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if streaming and not replay.enabled():
+            options.update(streaming=True, callbacks=callbacks)
+        client = ChatOpenAI(**options)
+    if replay.enabled():
+        # The replaying model streams recorded completions to the callbacks itself
+        from replay_chat import ReplayChatModel
+        client = ReplayChatModel(
+            model_name=model, temperature=temperature, inner=client,
+            streaming=streaming, callbacks=callbacks)
+    return client
+
+
+def clear():
+    """Drop the cached clients, e.g. after the API key or model changed."""
+    with _lock:
+        _clients.clear()
@@ -1,22 +1,261 @@
+import os
+import threading
+import time
 from crewai import Crew
 from textwrap import dedent
+import city_knowledge
+from prompts import DEFAULT_PROFILE, PROFILES
+from task_graph import TaskGraph
+from tools.chunking import count_tokens
 from trip_agents import TripAgents
 from trip_tasks import TripTasks
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Longest tool input / task output excerpt forwarded in a progress event
+EVENT_EXCERPT_CHARS = 500
+
+# Fan research out per candidate city instead of one sequential crew. Opt-in:
+# it adds a research crew per candidate plus a selection stage (four serial
+# LLM stages instead of three), so it costs more LLM calls and tokens and
+# only pays off in latency when research dominates and there are several
+# candidates, see TripCrew.run_graph
+PARALLEL_RESEARCH = os.environ.get("CREW_PARALLEL_RESEARCH", "").lower() in ("1", "true", "yes")
+# Crew tasks allowed to run at once in parallel mode
+RESEARCH_CONCURRENCY = int(os.environ.get("CREW_RESEARCH_CONCURRENCY", 3))
+
+# Token counters kept per job, named as in crewai's usage metrics
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens", "successful_requests")
+
+_templates_lock = threading.Lock()
+_agents = None
+_tasks = {}
+
+
+def crew_templates(profile=DEFAULT_PROFILE):
+  """The shared ``(TripAgents, TripTasks)`` pair used by every TripCrew.
+
+  Built once per process and prompt profile, on first use or by
+  :func:`warmup`.
+  """
+  global _agents
+  with _templates_lock:
+    if _agents is None:
+      _agents = TripAgents()
+    if profile not in _tasks:
+      _tasks[profile] = TripTasks(profile)
+    return _agents, _tasks[profile]
+
+
+def _output_text(output):
+  return str(getattr(output, "raw_output", None) or getattr(output, "raw", None) or output)
+
+
+def _usage_metrics(crew):
+  """Token usage crewai recorded for a finished crew, or None if unavailable."""
+  metrics = getattr(crew, "usage_metrics", None)
+  if metrics is None:
+    return None
+  if not isinstance(metrics, dict):
+    metrics = {name: getattr(metrics, name, 0) for name in USAGE_FIELDS}
+  if not metrics.get("total_tokens"):
+    return None
+  return {name: metrics.get(name, 0) or 0 for name in USAGE_FIELDS}
+
+
+class TokenUsage:
+  """Prompt and completion tokens of one trip, summed over its crews.
+
+  Counts come from crewai's usage metrics when it reports them. Otherwise
+  they are estimated from each task's description and output, one LLM
+  call per task, and ``estimated`` is set.
+  """
+
+  def __init__(self, profile):
+    self.profile = profile
+    self._lock = threading.Lock()
+    self.totals = dict.fromkeys(USAGE_FIELDS, 0)
+    self.task_prompt_tokens = {}
+    self.reused_tasks = []
+    self.estimated = False
+
+  def reuse(self, name):
+    """Record that ``name``'s output came from the city knowledge cache."""
+    with self._lock:
+      self.reused_tasks.append(name)
+
+  def add(self, crew, tasks, names, output):
+    reported = _usage_metrics(crew)
+    with self._lock:
+      for task, name in zip(tasks, names):
+        self.task_prompt_tokens[name] = count_tokens(task.description)
+      if reported is None:
+        self.estimated = True
+        outputs = [getattr(task, "output", None) for task in tasks]
+        completion = sum(count_tokens(_output_text(out)) for out in outputs if out is not None)
+        reported = {
+          "prompt_tokens": sum(count_tokens(task.description) for task in tasks),
+          "completion_tokens": completion or count_tokens(str(output)),
+          "successful_requests": len(tasks),
+        }
+        reported["total_tokens"] = reported["prompt_tokens"] + reported["completion_tokens"]
+      for name in USAGE_FIELDS:
+        self.totals[name] += reported.get(name, 0)
+
+  def to_dict(self):
+    with self._lock:
+      return dict(
+        self.totals,
+        profile=self.profile,
+        estimated=self.estimated,
+        task_prompt_tokens=dict(self.task_prompt_tokens),
+        reused_tasks=list(self.reused_tasks))
+
+
+def warmup():
+  """Load everything a crew needs ahead of the first job.
+
+  Builds the agent and task templates and the shared LLM clients, and
+  imports the HTML parser the browser tool would otherwise load in the
+  middle of a job.
+  """
+  from llm_registry import get_llm
+  from tools.browser_tools import html_partitioner
+  html_partitioner()
+  get_llm()
+  get_llm(streaming=True)
+  for profile in PROFILES:
+    crew_templates(profile)
+
+
+def _excerpt(value):
+  text = str(value)
+  if len(text) > EVENT_EXCERPT_CHARS:
+    return text[:EVENT_EXCERPT_CHARS] + "..."
+  return text
+
+
+class CrewProgress:
+  """Turns crewai step/task callbacks into progress events for ``on_event``.
+
+  The crew runs its tasks in order, so a finished task means the next one
+  has started.
+  """
+
+  def __init__(self, task_names, on_event):
+    self.task_names = task_names
+    self.on_event = on_event
+    self.current = 0
+    self.task_started_at = None
+
+  def start(self):
+    self._task_started()
+
+  def _task_started(self):
+    if self.current < len(self.task_names):
+      name = self.task_names[self.current]
+      self.task_started_at = time.monotonic()
+      self.on_event({"type": "task_started", "task": name, "data": f"Started {name}"})
+
+  def step_callback(self, step):
+    # Newer crewai passes an AgentAction, older versions a list of (action, observation)
+    actions = step if isinstance(step, list) else [step]
+    for action in actions:
+      if isinstance(action, tuple):
+        action = action[0]
+      tool = getattr(action, "tool", None)
+      if tool:
+        self.on_event({
+          "type": "tool_invoked",
+          "task": self.task_names[min(self.current, len(self.task_names) - 1)],
+          "tool": tool,
+          "input": _excerpt(getattr(action, "tool_input", "")),
+          "data": f"Using tool: {tool}"
+        })
+
+  def task_callback(self, output):
+    name = self.task_names[min(self.current, len(self.task_names) - 1)]
+    self.on_event({
+      "type": "task_finished",
+      "task": name,
+      "output": _excerpt(_output_text(output)),
+      "duration_s": round(time.monotonic() - self.task_started_at, 3),
+      "data": f"Finished {name}"
+    })
+    self.current += 1
+    self._task_started()
+
+
 class TripCrew:
 
-  def __init__(self, origin, cities, date_range, interests):
+  def __init__(self, origin, cities, date_range, interests, parallel=None, max_concurrency=None,
+               prompt_profile=DEFAULT_PROFILE):
     self.cities = cities
     self.origin = origin
     self.interests = interests
     self.date_range = date_range
+    self.parallel = PARALLEL_RESEARCH if parallel is None else parallel
+    self.max_concurrency = max_concurrency or RESEARCH_CONCURRENCY
+    self.prompt_profile = prompt_profile
+    # Token usage of the last run, see TokenUsage
+    self.usage = None
+
+  def candidate_cities(self):
+    """The requested cities, without blanks and case-insensitive repeats."""
+    candidates = {}
+    for city in self.cities.split(","):
+      city = city.strip()
+      if city:
+        candidates.setdefault(city.casefold(), city)
+    return list(candidates.values())
+
+  def _selection_key(self):
+    return city_knowledge.selection_key(
+      self.origin, self.cities, self.date_range, self.interests, self.prompt_profile)
+
+  def _guide_key(self, city):
+    return city_knowledge.guide_key(
+      city, self.origin, self.date_range, self.interests, self.prompt_profile)
 
-  def run(self):
-    agents = TripAgents()
-    tasks = TripTasks()
+  def _remember(self, report, guide=None):
+    """Store the selection report (and city guide) for later trips."""
+    city = city_knowledge.chosen_city(report, self.candidate_cities())
+    if city is None:
+      return
+    city_knowledge.put(self._selection_key(), {"report": report, "city": city})
+    if guide is not None:
+      city_knowledge.put(self._guide_key(city), guide)
+
+  def _reused(self, name, city, on_event):
+    self.usage.reuse(name)
+    if on_event is not None:
+      on_event({
+        "type": "task_reused",
+        "task": name,
+        "data": f"Reused {name} for {city} from the city knowledge cache"
+      })
+
+  def run(self, on_event=None):
+    """Run the crew; ``on_event`` receives a dict per task start/finish and tool use.
+
+    Research cached by an earlier trip (see city_knowledge) is reused
+    instead of running identify_task and gather_task again.
+    """
+    selection = city_knowledge.get(self._selection_key())
+    candidates = self.candidate_cities()
+    # With a single candidate the city is known before identify_task runs
+    city = selection["city"] if selection is not None else (
+      candidates[0] if len(candidates) == 1 else None)
+    guide = city_knowledge.get(self._guide_key(city)) if city is not None else None
+    if selection is not None or guide is not None:
+      return self.run_from_knowledge(selection, guide, on_event)
+    if self.parallel:
+      return self.run_graph(on_event)
+
+    self.usage = TokenUsage(self.prompt_profile)
+
+    agents, tasks = crew_templates(self.prompt_profile)
 
     city_selector_agent = agents.city_selection_agent()
     local_expert_agent = agents.local_expert()
@@ -42,18 +281,143 @@ class TripCrew:
       self.date_range
     )
 
+    callbacks = {}
+    progress = None
+    if on_event is not None:
+      progress = CrewProgress(["identify_task", "gather_task", "plan_task"], on_event)
+      callbacks = {
+        "step_callback": progress.step_callback,
+        "task_callback": progress.task_callback,
+      }
+
     crew = Crew(
       agents=[
         city_selector_agent, local_expert_agent, travel_concierge_agent
       ],
       tasks=[identify_task, gather_task, plan_task],
-      verbose=True
+      verbose=True,
+      **callbacks
     )
 
+    if progress is not None:
+      progress.start()
     result = crew.kickoff()
+    self.usage.add(
+      crew, [identify_task, gather_task, plan_task],
+      ["identify_task", "gather_task", "plan_task"], result)
+    if identify_task.output is not None and gather_task.output is not None:
+      self._remember(_output_text(identify_task.output), _output_text(gather_task.output))
+
+    return result
+
+  def run_from_knowledge(self, selection=None, guide=None, on_event=None):
+    """Plan from a cached selection report and/or city guide.
+
+    Whichever of identify_task and gather_task isn't cached runs as a
+    single-task crew, then plan_task gets both outputs as its context.
+    """
+    self.usage = TokenUsage(self.prompt_profile)
+    agents, tasks = crew_templates(self.prompt_profile)
+    if selection is None:
+      task = tasks.identify_task(
+        agents.city_selection_agent(), self.origin, self.cities, self.interests,
+        self.date_range)
+      report = self._kickoff_single(task, "identify_task", on_event)
+      self._remember(report)
+      city = self.candidate_cities()[0]
+    else:
+      report, city = selection["report"], selection["city"]
+      self._reused("identify_task", city, on_event)
+
+    if guide is None:
+      task = tasks.gather_task(
+        agents.local_expert(), self.origin, self.interests, self.date_range, context=[report])
+      guide = self._kickoff_single(task, "gather_task", on_event)
+      city_knowledge.put(self._guide_key(city), guide)
+    else:
+      self._reused("gather_task", city, on_event)
+
+    task = tasks.plan_task(
+      agents.travel_concierge(), self.origin, self.interests, self.date_range,
+      context=[report, guide])
+    return self._kickoff_single(task, "plan_task", on_event)
+
+  def run_graph(self, on_event=None):
+    """Run the trip tasks as a graph instead of one sequential crew.
+
+    Each candidate city is researched concurrently, the results are joined
+    by a selection task, then the city guide and the itinerary are built
+    from the selected city. Every node runs as its own single-task crew
+    and receives its dependencies' outputs as context.
+
+    This makes N research crews plus four serial stages (research, select,
+    gather, plan) where the sequential crew has three, so every job costs
+    more LLM calls; it is only used with CREW_PARALLEL_RESEARCH set.
+    """
+    self.usage = TokenUsage(self.prompt_profile)
+    agents, tasks = crew_templates(self.prompt_profile)
+    graph = TaskGraph(max_concurrency=self.max_concurrency)
+
+    def research(city):
+      def node(_):
+        task = tasks.research_task(
+          agents.city_selection_agent(), self.origin, city, self.interests, self.date_range)
+        return self._kickoff_single(task, f"research_task:{city}", on_event)
+      return node
+
+    research_nodes = [
+      graph.add(f"research_task:{city}", research(city))
+      for city in self.candidate_cities()
+    ]
+
+    def identify(inputs):
+      task = tasks.select_task(
+        agents.city_selection_agent(), self.origin, self.cities, self.interests,
+        self.date_range, [inputs[name] for name in research_nodes])
+      return self._kickoff_single(task, "identify_task", on_event)
+
+    def gather(inputs):
+      report = inputs["identify_task"]
+      self._remember(report)
+      city = city_knowledge.chosen_city(report, self.candidate_cities())
+      guide_key = self._guide_key(city) if city is not None else None
+      guide = city_knowledge.get(guide_key)
+      if guide is not None:
+        self._reused("gather_task", city, on_event)
+        return guide
+      guide = self._kickoff_single(
+        tasks.gather_task(
+          agents.local_expert(), self.origin, self.interests, self.date_range,
+          context=[report]),
+        "gather_task", on_event)
+      city_knowledge.put(guide_key, guide)
+      return guide
+
+    def plan(inputs):
+      task = tasks.plan_task(
+        agents.travel_concierge(), self.origin, self.interests, self.date_range,
+        context=[inputs["identify_task"], inputs["gather_task"]])
+      return self._kickoff_single(task, "plan_task", on_event)
 
-    # Print the result to see its type and structure
+    graph.add("identify_task", identify, deps=research_nodes)
+    graph.add("gather_task", gather, deps=["identify_task"])
+    graph.add("plan_task", plan, deps=["identify_task", "gather_task"])
+    return graph.run()["plan_task"]
 
+  def _kickoff_single(self, task, name, on_event):
+    callbacks = {}
+    progress = None
+    if on_event is not None:
+      progress = CrewProgress([name], on_event)
+      callbacks = {
+        "step_callback": progress.step_callback,
+        "task_callback": progress.task_callback,
+      }
+    crew = Crew(agents=[task.agent], tasks=[task], verbose=True, **callbacks)
+    if progress is not None:
+      progress.start()
+    result = str(crew.kickoff())
+    self.usage.add(crew, [task], [name], result)
     return result
 
 if __name__ == "__main__":
@@ -0,0 +1,338 @@
+"""Task description templates for trip_tasks.TripTasks.
+
+Each template is dedented and has its static fields filled in once, at
+import; rendering a task for a trip only substitutes the per-trip fields.
+
+Two profiles are available per request: "full", the original wording, and
+"compact", which asks for the same sections and formats in a fraction of
+the tokens. The task description is resent on every LLM iteration of its
+agent, so its size multiplies into latency and cost.
+"""
+import string
+from textwrap import dedent
+
+from tools.chunking import count_tokens
+
+PROFILES = ("full", "compact")
+DEFAULT_PROFILE = "full"
+
+# Instruction blocks shared by several tasks, kept in one place
+TIP_SECTION = "If you do your BEST WORK, I'll tip you $100!"
+# First line of a selection report; city_knowledge files the research by it
+CHOSEN_CITY_MARKER = "Chosen city:"
+CHOSEN_CITY_LINE = f'Start your final answer with the line "{CHOSEN_CITY_MARKER} <city>".'
+CHOSEN_CITY_REPORT = dedent("""\
+    Your final answer must be a detailed
+    report on the chosen city, and everything you found out
+    about it, including the actual flight costs, weather
+    forecast and attractions.
+    """) + CHOSEN_CITY_LINE + "\n" + TIP_SECTION
+
+
+class PromptTemplate:
+    """A task description compiled once, rendered per trip with ``str.format``.
+
+    ``static`` fields (the same for every trip) are substituted at compile
+    time. Dedenting happens before substitution, so a multi-line field
+    value can't change the indentation of the surrounding prompt.
+    """
+
+    __slots__ = ("text", "fields")
+
+    def __init__(self, template, **static):
+        text = dedent(template)
+        for name, value in static.items():
+            text = text.replace("{" + name + "}", value)
+        self.text = text
+        self.fields = frozenset(
+            name for _, name, _, _ in string.Formatter().parse(text) if name)
+
+    def render(self, **fields):
+        return self.text.format_map(fields)
+
+
+IDENTIFY_TEMPLATE = PromptTemplate("""
+    Analyze and select the best city for the trip based 
+    on specific criteria such as weather patterns, seasonal
+    events, and travel costs. This task involves comparing
+    multiple cities, considering factors like current weather
+    conditions, upcoming cultural or seasonal events, and
+    overall travel expenses. 
+
+    {chosen_city_report}
+
+    Traveling from: {origin}
+    City Options: {cities}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""", chosen_city_report=CHOSEN_CITY_REPORT)
+
+RESEARCH_TEMPLATE = PromptTemplate("""
+    Research {city} as a candidate destination for this trip.
+    Find the weather forecast for the trip dates, seasonal
+    and cultural events happening then, actual flight costs
+    from the origin, and typical prices for accommodation,
+    food and activities.
+
+    Your final answer must be a factual report on {city}
+    covering weather, events, flight costs and overall
+    travel expenses for these dates.
+    {tip}
+
+    Traveling from: {origin}
+    Candidate City: {city}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""", tip=TIP_SECTION)
+
+SELECT_TEMPLATE = PromptTemplate("""
+    Select the best city for the trip by comparing the
+    research reports below on weather patterns, seasonal
+    events, and travel costs.
+
+    {chosen_city_report}
+
+    Traveling from: {origin}
+    City Options: {cities}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""", chosen_city_report=CHOSEN_CITY_REPORT)
+
+GATHER_TEMPLATE = PromptTemplate("""
+    As a local expert on this city you must compile an 
+    in-depth guide for someone traveling there and wanting 
+    to have THE BEST trip ever!
+    Gather information about key attractions, local customs,
+    special events, and daily activity recommendations.
+    Find the best spots to go to, the kind of place only a
+    local would know.
+    This guide should provide a thorough overview of what 
+    the city has to offer, including hidden gems, cultural
+    hotspots, must-visit landmarks, weather forecasts, and
+    high level costs.
+
+    The final answer must be a comprehensive city guide, 
+    rich in cultural insights and practical tips, 
+    tailored to enhance the travel experience.
+    {tip}
+
+    Trip Date: {date_range}
+    Traveling from: {origin}
+    Traveler Interests: {interests}
+""", tip=TIP_SECTION)
+
+PLAN_TEMPLATE = PromptTemplate("""
+    Expand this guide into a full travel 
+    itinerary based on the date range given by the user, 
+    so if the date range is of ten days 
+    then the trip itinerary is for ten days and if it is 
+    for 7 days then itinerary is for seven days. Give result                        
+    with detailed per-day plans, including 
+    weather forecasts, places to eat, packing suggestions, 
+    and a budget breakdown.
+    I am also giving you the reference date input which will 
+    come 03/11/2024 to 05/11/2024, this means it is from 3rd
+    November till 5th November
+
+    You MUST suggest actual places to visit, actual hotels 
+    to stay, actual restaurants to go to, and optimal transportation 
+    logistics (flights, trains, buses, or car rentals) from the origin 
+    to the destination and within the city.
+
+    This itinerary should cover all aspects of the trip, 
+    from arrival to departure, integrating the city guide
+    information with practical travel logistics.
+
+    Your final answer MUST start with a brief overview of the whole trip and then
+    be a complete expanded travel plan,formatted as a bullet point list, with each day shown in a different paragraph, 
+    broken into as many paragraphs as possible, including anticipated weather conditions, 
+    recommended clothing and items to pack, and a detailed budget. Be specific and give 
+    reasons why you picked each place, what makes them special. Use '---' to separate days 
+    and sections.
+
+    After the daily itinerary, include a SEPARATE SECTION titled "Accommodation Options"
+    that lists accommodations day by day with details including:
+    - Hotel/accommodation name for each day of the trip
+    - Brief description of the accommodation
+    - Price range
+    - Actual working URL for booking
+    - Any special amenities or features
+    Format each accommodation option as a bullet point with the URL in parentheses,
+    like: "- Day 1: Hilton Garden Inn - Luxury hotel with pool, $150/night
+    (https://www.booking.com/hotel/hilton-garden.html)".
+
+    After that, include a separate section titled 
+    "Logistics Options" that lists transportation suggestions (e.g., flights, trains, buses, car rentals) 
+    from {origin} to the destination city, including estimated costs, travel times, reasons, 
+    and clickable URLs for booking or more information. Format each logistics option as a bullet point 
+    with the URL in parentheses, like: "- Flight: Fly from {origin} to destination, $200, 4 hours, 
+    reason: speed (https://www.britishairways.com/en-us/destinations/dubai/flights-to-dubai)". 
+    Use real, functional URLs for airlines (e.g., British Airways, Emirates), transportation services 
+    (e.g., Dubai Metro, Careem), and hotel bookings (e.g., Expedia, Booking.com).
+
+    Finally, include a section titled "Budget Line Items" that lists every 
+    expected cost of the trip, one per line, in exactly this format:
+    "- Day <n> | <Category> | <what it is> | $<unit cost> x <quantity>"
+    where Category is one of Accommodation, Meals, Activities, Transportation 
+    or Miscellaneous. Cover accommodation, breakfast, lunch and dinner, entrance 
+    fees, local transportation and miscellaneous expenses for each day, and use 
+    Day 0 for costs not tied to a day, like flights. For example:
+    "- Day 1 | Accommodation | Hilton Garden Inn, per night | $150 x 1"
+    "- Day 1 | Meals | Lunch and dinner | $25 x 2"
+    "- Day 0 | Transportation | Return flight | $750 x 1"
+    Do NOT add up totals, daily sums or a contingency fund yourself; 
+    they are calculated from these line items for you.
+
+    After the budget line items, include a separate section titled "Real-Time Flight Pricing"
+    that provides up-to-date flight options for the specified date range from {origin} to
+    the destination. For each flight option include:
+    - Airline name and flight number(s)
+    - Departure and arrival times
+    - Current price with currency
+    - Travel duration
+    - Number of stops (if any)
+    - Class options (Economy, Premium Economy, Business, First) with price differences
+    - Baggage allowance
+    - Reliable booking URL (e.g., to the airline's official site or trusted booking platforms like Expedia, Kayak, or Skyscanner)
+    Format each flight option as a bullet point with the URL in parentheses, for example:
+    "- Emirates EK506: {origin} to Dubai, 9:15 AM - 7:45 PM, $750, 8h 30m, 0 stops, Economy (20kg baggage)
+    (https://www.emirates.com/us/english/book/)"
+
+    Next, include a section titled "Weather Forecast and Packing Suggestions" that provides:
+    - Day-by-day weather forecast for the destination during the trip dates
+    - Temperature ranges (high/low) in both Fahrenheit and Celsius
+    - Precipitation probability and expected conditions
+    - Detailed packing list based on the forecasted weather, planned activities, and local customs
+    - Special items needed for specific activities or locations
+    - Seasonal considerations and local weather patterns to be aware of
+
+    Finally, include a section titled "Restaurant Reservations" that recommends:
+    - At least one restaurant option for each day of the trip
+    - Price range and cuisine type for each restaurant
+    - Signature dishes or specialties to try
+    - Reservation requirements (whether booking in advance is necessary)
+    - Direct reservation links or phone numbers
+    - Best times to visit and estimated wait times
+    Format each restaurant recommendation as a bullet point with reservation details, for example:
+    "- Day 2 Dinner: La Petite Maison - High-end French-Mediterranean cuisine, $$$, Signature dish: Burrata
+    with tomatoes and basil. Reservations required 2-3 weeks in advance.
+    (https://www.lpmlondon.co.uk/dubai/)"
+
+    Separate each section from the others with '---'.
+
+    {tip}
+
+    Trip Date: {date_range}
+    Traveling from: {origin}
+    Traveler Interests: {interests}
+""", tip=TIP_SECTION)
+
+
+COMPACT_IDENTIFY_TEMPLATE = PromptTemplate("""
+    Pick the best of the candidate cities for this trip, weighing weather,
+    seasonal events and travel costs for the trip dates.
+    Final answer: a detailed report on the chosen city with actual flight
+    costs, weather forecast and attractions.
+    {chosen_city_line}
+
+    Traveling from: {origin}
+    City Options: {cities}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""", chosen_city_line=CHOSEN_CITY_LINE)
+
+COMPACT_RESEARCH_TEMPLATE = PromptTemplate("""
+    Research {city} as a destination for the trip dates: weather forecast,
+    events, actual flight costs from the origin and typical prices for
+    accommodation, food and activities.
+    Final answer: a factual report on {city} covering those points.
+
+    Traveling from: {origin}
+    Candidate City: {city}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""")
+
+COMPACT_SELECT_TEMPLATE = PromptTemplate("""
+    Pick the best city for the trip by comparing the research reports below
+    on weather, seasonal events and travel costs.
+    Final answer: a detailed report on the chosen city with actual flight
+    costs, weather forecast and attractions.
+    {chosen_city_line}
+
+    Traveling from: {origin}
+    City Options: {cities}
+    Trip Date: {date_range}
+    Traveler Interests: {interests}
+""", chosen_city_line=CHOSEN_CITY_LINE)
+
+COMPACT_GATHER_TEMPLATE = PromptTemplate("""
+    As a local expert, write an in-depth guide to this city for the
+    traveler: key attractions, hidden gems only locals know, customs,
+    events, weather and high level costs.
+    Final answer: a comprehensive city guide with practical tips.
+
+    Trip Date: {date_range}
+    Traveling from: {origin}
+    Traveler Interests: {interests}
+""")
+
+COMPACT_PLAN_TEMPLATE = PromptTemplate("""
+    Expand the city guide into a complete itinerary for every day of the
+    trip dates (DD/MM/YYYY), from arrival to departure. Start with a brief
+    trip overview, then one "Day N" section per day as bullet points with
+    actual places, hotels and restaurants, transport from {origin} and within
+    the city, expected weather, and why each pick is special.
+
+    Then add these sections in this order, titled exactly as quoted.
+    Separate every day and section with '---'. Write each option as a
+    bullet point ending with a real booking URL in parentheses, e.g.
+    "- Day 1: Hilton Garden Inn - pool, $150/night (https://www.booking.com/)".
+    - "Accommodation Options": hotel per day, description, price range, amenities.
+    - "Logistics Options": flights, trains, buses or car rentals from {origin},
+      with cost, duration and reason.
+    - "Budget Line Items": every expected cost, one per line, exactly
+      "- Day <n> | <Category> | <what it is> | $<unit cost> x <quantity>"
+      with Category one of Accommodation, Meals, Activities, Transportation
+      or Miscellaneous, and Day 0 for costs not tied to a day, like flights.
+      Don't add totals or a contingency fund; they are computed for you.
+    - "Real-Time Flight Pricing": airline and flight number, times, price,
+      duration, stops, class options and baggage.
+    - "Weather Forecast and Packing Suggestions": daily high/low in °F and
+      °C, precipitation, packing list for the weather and activities.
+    - "Restaurant Reservations": at least one per day with cuisine, price
+      range, signature dish and reservation requirements.
+
+    Trip Date: {date_range}
+    Traveling from: {origin}
+    Traveler Interests: {interests}
+""")
+
+TEMPLATES = {
+    "full": {
+        "identify_task": IDENTIFY_TEMPLATE,
+        "research_task": RESEARCH_TEMPLATE,
+        "select_task": SELECT_TEMPLATE,
+        "gather_task": GATHER_TEMPLATE,
+        "plan_task": PLAN_TEMPLATE,
+    },
+    "compact": {
+        "identify_task": COMPACT_IDENTIFY_TEMPLATE,
+        "research_task": COMPACT_RESEARCH_TEMPLATE,
+        "select_task": COMPACT_SELECT_TEMPLATE,
+        "gather_task": COMPACT_GATHER_TEMPLATE,
+        "plan_task": COMPACT_PLAN_TEMPLATE,
+    },
+}
+
+
+def prompt_tokens(profile=DEFAULT_PROFILE, **fields):
+    """Token count of each task description of ``profile`` for these trip fields.
+
+    Missing fields count as empty strings.
+    """
+    counts = {}
+    for task, template in TEMPLATES[profile].items():
+        values = {name: fields.get(name, "") for name in template.fields}
+        counts[task] = count_tokens(template.render(**values))
+    return counts
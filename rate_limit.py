@@ -0,0 +1,237 @@
+"""Process-wide throttling of the upstream APIs the crews call.
+
+Each upstream (Serper, browserless, OpenAI) gets one :class:`RateLimiter`
+per process: a token bucket of RATE_LIMIT_<UPSTREAM>_RPS requests per
+second (bursts of RATE_LIMIT_<UPSTREAM>_BURST) plus at most
+RATE_LIMIT_<UPSTREAM>_CONCURRENCY requests in flight; 0 turns either
+limit off. Callers over the limit queue instead of failing, for up to
+RATE_LIMIT_MAX_WAIT seconds. A 429 from the upstream pauses its limiter
+for the Retry-After the upstream asked for, so concurrent jobs back off
+together instead of each retrying into the limit.
+
+Limits apply per process: with CREW_BACKEND=process every worker has its
+own, so divide the upstream's quota by CREW_MAX_WORKERS.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from tracing import record_span
+
+MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", 120))
+# Pause after a 429 that came without a usable Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+
+# Default (requests per second, concurrent requests) per upstream
+DEFAULTS = {
+    "serper": (5, 4),
+    "browserless": (2, 2),
+    "openai": (0, 8),
+}
+HOSTS = {
+    "google.serper.dev": "serper",
+    "chrome.browserless.io": "browserless",
+    "api.openai.com": "openai",
+}
+
+_lock = threading.Lock()
+_limiters = {}
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a request waited RATE_LIMIT_MAX_WAIT without getting a slot."""
+
+
+def retry_after_seconds(value, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait from a Retry-After header (seconds or an HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Token bucket plus a concurrency cap; waiting callers queue on a condition."""
+
+    def __init__(self, name, rate=0, burst=None, concurrency=0, max_wait=MAX_WAIT):
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {"requests": 0, "throttled": 0, "timeouts": 0, "wait_s": 0.0}
+
+    def _delay_locked(self, now):
+        """Seconds until a request may start, 0 if it may start now, None
+        if it has to wait for a running request to finish."""
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.concurrency and self._in_flight >= self.concurrency:
+            return None
+        if self.rate and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0
+
+    def acquire(self):
+        """Wait for a slot; returns the seconds waited."""
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay_locked(now)
+                    if delay == 0:
+                        break
+                    if now >= deadline:
+                        self._counters["timeouts"] += 1
+                        raise RateLimitTimeout(
+                            f"No {self.name} request slot within {self.max_wait:g}s")
+                    remaining = deadline - now
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+                if self.rate:
+                    self._tokens -= 1
+                self._in_flight += 1
+                waited = time.monotonic() - start
+                self._counters["requests"] += 1
+                self._counters["wait_s"] += waited
+            finally:
+                self._waiting -= 1
+        if waited >= 0.001:
+            record_span("rate_limit", self.name, waited)
+        return waited
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def throttled(self, retry_after=None):
+        """The upstream answered 429: pause every caller for ``retry_after``."""
+        pause = retry_after_seconds(retry_after)
+        with self._cond:
+            self._counters["throttled"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._tokens = min(self._tokens, 0)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counters, wait_s=round(self._counters["wait_s"], 3),
+                        waiting=self._waiting, in_flight=self._in_flight)
+
+
+def limiter(name):
+    """The process-wide limiter of upstream ``name``, configured from the environment."""
+    with _lock:
+        if name not in _limiters:
+            rate, concurrency = DEFAULTS.get(name, (0, 0))
+            prefix = f"RATE_LIMIT_{name.upper()}_"
+            rate = float(os.environ.get(prefix + "RPS", rate))
+            burst = os.environ.get(prefix + "BURST")
+            _limiters[name] = RateLimiter(
+                name, rate=rate, burst=float(burst) if burst else None,
+                concurrency=int(os.environ.get(prefix + "CONCURRENCY", concurrency)))
+        return _limiters[name]
+
+
+def for_host(host):
+    """The limiter of the upstream served from ``host``, None if it isn't limited."""
+    name = HOSTS.get(host)
+    return limiter(name) if name is not None else None
+
+
+def for_url(url):
+    return for_host(urlsplit(url).hostname)
+
+
+def stats():
+    """Per-upstream counters of the limiters used in this process."""
+    with _lock:
+        limiters = list(_limiters.values())
+    return {rl.name: rl.stats() for rl in limiters}
+
+
+def httpx_client(name):
+    """An httpx client (for the OpenAI SDK) whose requests go through ``name``'s limiter.
+
+    Every attempt, including the SDK's own retries, takes a slot and holds
+    it until the response is closed, so streamed completions count
+    against the concurrency cap for as long as they stream. A 429 pauses
+    the limiter. The SDK retries any exception a transport raises, so a
+    RateLimitTimeout is answered with a 429 carrying ``x-should-retry:
+    false`` instead, which the SDK raises as a RateLimitError right away.
+    """
+    import httpx
+    try:
+        from openai import DefaultHttpxClient as Client
+    except ImportError:
+        Client = httpx.Client
+
+    class _SlotStream(httpx.SyncByteStream):
+        """Response body that gives the limiter slot back when it is closed."""
+
+        def __init__(self, stream, release):
+            self._stream = stream
+            self._release = release
+
+        def __iter__(self):
+            yield from self._stream
+
+        def close(self):
+            try:
+                self._stream.close()
+            finally:
+                release, self._release = self._release, None
+                if release is not None:
+                    release()
+
+    class _LimitedTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            rl = limiter(name)
+            try:
+                rl.acquire()
+            except RateLimitTimeout as e:
+                return httpx.Response(
+                    429, headers={"x-should-retry": "false"},
+                    json={"error": {"message": str(e), "type": "rate_limit_timeout"}},
+                    request=request)
+            try:
+                response = super().handle_request(request)
+            except BaseException:
+                rl.release()
+                raise
+            response.stream = _SlotStream(response.stream, rl.release)
+            if response.status_code == 429:
+                rl.throttled(response.headers.get("retry-after"))
+            return response
+
+    return Client(transport=_LimitedTransport())
@@ -0,0 +1,86 @@
+"""Record and replay the pipeline's external calls, for offline runs.
+
+With REPLAY_MODE=record every LLM completion and every HTTP response
+(Serper searches, browserless page fetches) is passed through and also
+written to a fixture file under REPLAY_DIR. With REPLAY_MODE=replay they
+are served from those files without touching the network, after sleeping
+for the recorded latency times REPLAY_LATENCY_SCALE, or for a fixed
+REPLAY_LATENCY seconds when that is set. Fixtures are keyed by a hash of
+the request, so a replay is deterministic as long as the prompts are.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+MODES = ("off", "record", "replay")
+
+MODE = os.environ.get("REPLAY_MODE", "off").lower() or "off"
+if MODE not in MODES:
+    raise ValueError(f"REPLAY_MODE must be one of: {', '.join(MODES)}")
+DIRECTORY = os.environ.get("REPLAY_DIR", os.path.join("benchmarks", "fixtures"))
+LATENCY = os.environ.get("REPLAY_LATENCY")
+LATENCY_SCALE = float(os.environ.get("REPLAY_LATENCY_SCALE", 1))
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def enabled():
+    return MODE != "off"
+
+
+def fixture_key(request):
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(kind, request):
+    return os.path.join(DIRECTORY, kind, fixture_key(request) + ".json")
+
+
+def load(kind, request):
+    try:
+        with open(_path(kind, request), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ReplayMissError(
+            f"No {kind} fixture in {DIRECTORY} for {json.dumps(request)[:200]}; "
+            f"record one with REPLAY_MODE=record") from None
+
+
+def save(kind, request, response, elapsed):
+    """Write a fixture atomically, so concurrent jobs never see half a file."""
+    path = _path(kind, request)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"request": request, "response": response,
+                   "elapsed_s": round(elapsed, 6)}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def simulated_latency(elapsed):
+    if LATENCY is not None:
+        return float(LATENCY)
+    return elapsed * LATENCY_SCALE
+
+
+def call(kind, request, fn):
+    """``fn()`` for ``request``: live, recorded or replayed depending on REPLAY_MODE.
+
+    ``request`` and the result of ``fn`` must be JSON-serializable.
+    """
+    if MODE == "replay":
+        fixture = load(kind, request)
+        delay = simulated_latency(fixture["elapsed_s"])
+        if delay > 0:
+            time.sleep(delay)
+        return fixture["response"]
+    start = time.monotonic()
+    response = fn()
+    if MODE == "record":
+        save(kind, request, response, time.monotonic() - start)
+    return response
@@ -0,0 +1,50 @@
+"""Chat model that records or replays completions, see :mod:`replay`.
+
+Only imported by llm_registry when REPLAY_MODE is set.
+"""
+import re
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import replay
+
+
+class ReplayChatModel(BaseChatModel):
+    """Wraps ``inner`` (the real client, None in replay mode) with replay fixtures."""
+
+    model_name: str
+    temperature: Optional[float] = None
+    inner: Any = None
+    # Replay the completion to the callbacks word by word, as a streaming client would
+    streaming: bool = False
+
+    @property
+    def _llm_type(self):
+        return "replay"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs):
+        request = {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "messages": [[message.type, message.content] for message in messages],
+            "stop": stop,
+        }
+
+        def complete():
+            message = self.inner.invoke(messages, stop=stop, **kwargs)
+            return {
+                "content": message.content,
+                "token_usage": message.response_metadata.get("token_usage"),
+            }
+
+        response = replay.call("llm", request, complete)
+        if self.streaming and run_manager is not None:
+            for token in re.findall(r"\S+\s*|\s+", response["content"]):
+                run_manager.on_llm_new_token(token)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=response["content"]))],
+            llm_output={"token_usage": response["token_usage"] or {},
+                        "model_name": self.model_name})
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from dateutil.parser import parse
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_text(value):
+    return _WHITESPACE_RE.sub(" ", value).strip().lower()
+
+
+def normalize_trip_request(location, cities, date_range, interests):
+    """Canonical form of a trip request, insensitive to case, spacing,
+    city order and date formatting."""
+    start_date, end_date = date_range.split(" to ")
+    city_list = sorted(
+        {_normalize_text(city) for city in cities.split(",") if city.strip()}
+    )
+    return {
+        "location": _normalize_text(location),
+        "cities": city_list,
+        "date_range": [
+            parse(start_date, dayfirst=True).date().isoformat(),
+            parse(end_date, dayfirst=True).date().isoformat(),
+        ],
+        "interests": _normalize_text(interests),
+    }
+
+
+def trip_cache_key(location, cities, date_range, interests, prompt_profile=None):
+    normalized = normalize_trip_request(location, cities, date_range, interests)
+    if prompt_profile is not None:
+        normalized["prompt_profile"] = prompt_profile
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """TTL + LRU cache of cleaned crew results, with single-flight tracking.
+
+    ``claim`` records which job is currently producing the result for a key
+    so identical requests arriving meanwhile can be pointed at that job
+    instead of starting another crew.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, coalesce=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.coalesce = coalesce
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if stored_at < time.time() - self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def set(self, key, result):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def claim(self, key, job_id):
+        """Register ``job_id`` as in flight for ``key``.
+
+        Returns the job already in flight for the key, or None if the caller
+        now owns it. Always None when coalescing is off.
+        """
+        if not self.coalesce:
+            return None
+        with self._lock:
+            existing = self._in_flight.get(key)
+            if existing is not None:
+                return existing[0]
+            self._in_flight[key] = (job_id, time.monotonic())
+            return None
+
+    def replace(self, key, old_job_id, job_id, min_age=0):
+        """Hand ``key`` from ``old_job_id`` to ``job_id`` if ``old_job_id`` has
+        held it for at least ``min_age`` seconds; returns whether it did.
+
+        Lets exactly one request take over from a job that vanished.
+        """
+        with self._lock:
+            existing = self._in_flight.get(key)
+            if existing is None or existing[0] != old_job_id:
+                return False
+            if time.monotonic() - existing[1] < min_age:
+                return False
+            self._in_flight[key] = (job_id, time.monotonic())
+            return True
+
+    def release(self, key, job_id):
+        with self._lock:
+            existing = self._in_flight.get(key)
+            if existing is not None and existing[0] == job_id:
+                del self._in_flight[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def result_cache_from_env():
+    """Build a cache configured by RESULT_CACHE_TTL / RESULT_CACHE_MAX_ENTRIES.
+
+    A TTL of 0 disables caching; single-flight coalescing stays on unless
+    RESULT_CACHE_COALESCE=0 (benchmarks run identical trips side by side).
+    """
+    return ResultCache(
+        max_entries=int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 256)),
+        ttl=int(os.environ.get("RESULT_CACHE_TTL", 3600)),
+        coalesce=os.environ.get("RESULT_CACHE_COALESCE", "1").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+
+
+class QueueFullError(Exception):
+    """Raised when the admission queue cannot take another job."""
+
+
+class SchedulerClosedError(Exception):
+    """Raised when a job is submitted after the scheduler was shut down."""
+
+
+class JobScheduler:
+    """Run jobs on a bounded worker pool behind a bounded priority queue.
+
+    At most ``max_workers`` jobs run at once; up to ``max_queue_size`` more
+    wait in the queue, ordered by priority (lower first) and then FIFO.
+    """
+
+    def __init__(self, max_workers=4, max_queue_size=32):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="trip-crew"
+        )
+        self._lock = RLock()
+        self._queue = []  # heap of (priority, seq, job_id, fn, args)
+        self._counter = itertools.count()
+        self._running = set()
+        self._closed = False
+
+    def submit(self, job_id, fn, *args, priority=0):
+        """Admit a job, returning its queue position (0 if it starts right away)."""
+        with self._lock:
+            if self._closed:
+                raise SchedulerClosedError("Scheduler is shutting down")
+            if len(self._queue) >= self.max_queue_size:
+                raise QueueFullError(
+                    f"Queue is full ({self.max_queue_size} jobs waiting)"
+                )
+            heapq.heappush(self._queue, (priority, next(self._counter), job_id, fn, args))
+            self._dispatch_locked()
+            return self._position_locked(job_id) or 0
+
+    def submit_many(self, jobs):
+        """Admit ``(job_id, fn, args, priority)`` jobs all together or none of them.
+
+        Returns their queue positions, as :meth:`submit` does.
+        """
+        with self._lock:
+            if self._closed:
+                raise SchedulerClosedError("Scheduler is shutting down")
+            idle_workers = max(0, self.max_workers - len(self._running))
+            waiting = len(self._queue) + max(0, len(jobs) - idle_workers)
+            if waiting > self.max_queue_size:
+                raise QueueFullError(
+                    f"Queue can't take {len(jobs)} more jobs "
+                    f"({len(self._queue)} of {self.max_queue_size} waiting)"
+                )
+            for job_id, fn, args, priority in jobs:
+                heapq.heappush(self._queue, (priority, next(self._counter), job_id, fn, args))
+            self._dispatch_locked()
+            return [self._position_locked(job_id) or 0 for job_id, _, _, _ in jobs]
+
+    def queue_position(self, job_id):
+        """1-based position of a waiting job, or None if it is not queued."""
+        with self._lock:
+            return self._position_locked(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _position_locked(self, job_id):
+        for position, entry in enumerate(sorted(self._queue), start=1):
+            if entry[2] == job_id:
+                return position
+        return None
+
+    def _dispatch_locked(self):
+        while self._queue and len(self._running) < self.max_workers:
+            _, _, job_id, fn, args = heapq.heappop(self._queue)
+            self._running.add(job_id)
+            future = self._executor.submit(fn, *args)
+            future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+
+    def _on_done(self, job_id, future):
+        if future.exception() is not None:
+            logging.error(f"Job {job_id} raised outside of its handler: {future.exception()}")
+        with self._lock:
+            self._running.discard(job_id)
+            if not self._closed:
+                self._dispatch_locked()
+
+
+def scheduler_from_env():
+    """Build a scheduler configured by CREW_MAX_WORKERS / CREW_MAX_QUEUE_SIZE."""
+    return JobScheduler(
+        max_workers=int(os.environ.get("CREW_MAX_WORKERS", 4)),
+        max_queue_size=int(os.environ.get("CREW_MAX_QUEUE_SIZE", 32)),
+    )
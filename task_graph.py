@@ -0,0 +1,71 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TaskGraphError(Exception):
+    """Raised for graphs that can't run: unknown dependencies or cycles."""
+
+
+class TaskGraph:
+    """Run named callables as a dependency graph on a bounded thread pool.
+
+    Each node's callable receives a dict of its dependencies' results keyed
+    by node name. A node starts as soon as all of its dependencies finished,
+    with at most ``max_concurrency`` nodes running at once. The first node
+    to raise cancels everything not yet started and re-raises.
+    """
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self._nodes = {}
+
+    def add(self, name, fn, deps=()):
+        if name in self._nodes:
+            raise TaskGraphError(f"Duplicate task {name!r}")
+        self._nodes[name] = (fn, tuple(deps))
+        return name
+
+    def _check(self):
+        for name, (_, deps) in self._nodes.items():
+            for dep in deps:
+                if dep not in self._nodes:
+                    raise TaskGraphError(f"Task {name!r} depends on unknown task {dep!r}")
+        # Kahn's algorithm: anything left over sits on a cycle
+        remaining = {name: set(deps) for name, (_, deps) in self._nodes.items()}
+        while True:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise TaskGraphError(f"Cycle between tasks: {', '.join(sorted(remaining))}")
+
+    def run(self):
+        """Execute the graph and return every node's result keyed by name."""
+        self._check()
+        results = {}
+        pending = dict(self._nodes)
+        running = {}
+        with ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="task-graph") as pool:
+            while pending or running:
+                for name, (fn, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        del pending[name]
+                        inputs = {dep: results[dep] for dep in deps}
+                        # Nodes see the caller's context variables, e.g. its job trace
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, fn, inputs)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        for other in running:
+                            other.cancel()
+                        raise error
+                    results[name] = future.result()
+        return results
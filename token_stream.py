@@ -0,0 +1,104 @@
+"""Live output of the travel concierge, streamed as its LLM generates it.
+
+The concierge's LLM client streams tokens to a langchain callback handler
+(see :func:`callback_handler`), which feeds them to the job's
+:class:`TokenSink` while run_trip has it activated. The sink forwards only
+the final answer, not the agent's thoughts and tool calls, as
+``{"type": "partial"}`` events through the job's ``on_event`` channel, at
+most every PARTIAL_FLUSH_INTERVAL seconds.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+FLUSH_INTERVAL = float(os.environ.get("PARTIAL_FLUSH_INTERVAL", 0.25))
+# What a ReAct agent writes before the answer it returns
+ANSWER_MARKER = "Final Answer:"
+
+_current = contextvars.ContextVar("token_sink", default=None)
+
+
+class TokenSink:
+    """Batches the final-answer tokens of a job's LLM calls into events."""
+
+    def __init__(self, on_event, interval=FLUSH_INTERVAL):
+        self.on_event = on_event
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._call_text = ""
+        self._answering = False
+        self._answered = False
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def start_call(self):
+        with self._lock:
+            # A new answer replaces one streamed by an earlier call
+            reset = self._answered
+            self._call_text = ""
+            self._answering = self._answered = False
+            self._buffer = []
+        if reset and self.on_event is not None:
+            self.on_event({"type": "partial", "reset": True, "text": ""})
+
+    def token(self, text):
+        with self._lock:
+            if not self._answering:
+                self._call_text += text
+                _, marker, answer = self._call_text.partition(ANSWER_MARKER)
+                if not marker:
+                    return
+                self._answering = self._answered = True
+                self._call_text = ""
+                text = answer.lstrip()
+            self._buffer.append(text)
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            text = "".join(self._buffer)
+            self._buffer = []
+            self._last_flush = time.monotonic()
+        if text and self.on_event is not None:
+            self.on_event({"type": "partial", "text": text})
+
+
+@contextmanager
+def activate(sink):
+    """Make ``sink`` receive streamed tokens in this context; flushes on exit."""
+    token = _current.set(sink)
+    try:
+        yield sink
+    finally:
+        _current.reset(token)
+        sink.flush()
+
+
+def callback_handler():
+    """Langchain callback handler passing streamed tokens to the active sink."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _Handler(BaseCallbackHandler):
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            self.on_llm_start(serialized, [], **kwargs)
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            sink = _current.get()
+            if sink is not None:
+                sink.start_call()
+
+        def on_llm_new_token(self, token, **kwargs):
+            sink = _current.get()
+            if sink is not None:
+                sink.token(token)
+
+        def on_llm_end(self, response, **kwargs):
+            sink = _current.get()
+            if sink is not None:
+                sink.flush()
+
+    return _Handler()
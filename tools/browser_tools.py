@@ -1,10 +1,220 @@
+import hashlib
+import itertools
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from crewai import Agent, Task
 from langchain.tools import tool
-from unstructured.partition.html import partition_html
+
+from llm_registry import get_llm
+from rate_limit import RateLimitTimeout
+from tools import http_client
+from tools.chunking import iter_chunks
+from tools.disk_cache import DiskCache
+from tracing import traced_call
+
+# Token budget per summarized chunk (~8000 characters of English text)
+CHUNK_TOKENS = int(os.environ.get("SCRAPE_CHUNK_TOKENS", 2000))
+# Chunks summarized concurrently, shared by every scrape in the process
+SUMMARY_WORKERS = int(os.environ.get("SCRAPE_SUMMARY_WORKERS", 4))
+# Chunks beyond this per page are dropped rather than summarized
+MAX_CHUNKS_PER_PAGE = int(os.environ.get("SCRAPE_MAX_CHUNKS", 12))
+# Merge per-chunk summaries into one with a final LLM pass
+MERGE_SUMMARIES = os.environ.get("SCRAPE_MERGE_SUMMARIES", "1").lower() in ("1", "true", "yes")
+# Seconds a scraped page is served without re-fetching it
+PAGE_FRESH_TTL = int(os.environ.get("SCRAPE_PAGE_TTL", 6 * 3600))
+
+_executor_lock = threading.Lock()
+_executor = None
+
+# Summarizer agents are reused per thread; an agent runs one task at a time
+_summarizer_local = threading.local()
+
+_cache_lock = threading.Lock()
+_page_cache = None
+_summary_cache = None
+
+
+def page_cache():
+  """Chunked page text keyed by URL.
+
+  Entries are kept for SCRAPE_PAGE_RETENTION seconds so stale pages can
+  still be compared against a fresh fetch; freshness is PAGE_FRESH_TTL.
+  """
+  global _page_cache
+  with _cache_lock:
+    if _page_cache is None:
+      _page_cache = DiskCache(
+          "scraped_page_chunks",
+          ttl=int(os.environ.get("SCRAPE_PAGE_RETENTION", 7 * 24 * 3600)),
+          max_bytes=int(os.environ.get("SCRAPE_PAGE_CACHE_MAX_BYTES", 200 * 1024 * 1024)))
+    return _page_cache
+
+
+def summary_cache():
+  """LLM summaries keyed by a hash of the content summarized, see SCRAPE_SUMMARY_TTL."""
+  global _summary_cache
+  with _cache_lock:
+    if _summary_cache is None:
+      _summary_cache = DiskCache(
+          "chunk_summaries",
+          ttl=int(os.environ.get("SCRAPE_SUMMARY_TTL", 7 * 24 * 3600)),
+          max_bytes=int(os.environ.get("SCRAPE_SUMMARY_CACHE_MAX_BYTES", 100 * 1024 * 1024)))
+    return _summary_cache
+
+
+def html_partitioner():
+  """``unstructured``'s partition_html, imported on first use.
+
+  unstructured takes seconds to import, and most scrapes are served from
+  the page cache without parsing anything.
+  """
+  from unstructured.partition.html import partition_html
+  return partition_html
+
+
+def _content_hash(text):
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _summary_executor():
+  global _executor
+  with _executor_lock:
+    if _executor is None:
+      _executor = ThreadPoolExecutor(
+          max_workers=SUMMARY_WORKERS, thread_name_prefix="scrape-summary")
+    return _executor
+
+
+def _summarizer():
+  """This thread's summarizer agent, built on first use and reused for every chunk."""
+  agent = getattr(_summarizer_local, "agent", None)
+  if agent is None:
+    agent = _summarizer_local.agent = Agent(
+        role='Principal Researcher',
+        goal=
+        'Do amazing researches and summaries based on the content you are working with',
+        backstory=
+        "You're a Principal Researcher at a big company and you need to do a research about a given topic.",
+        llm=get_llm(),
+        allow_delegation=False)
+  return agent
+
+
+def _run_summary(description):
+  task = Task(agent=_summarizer(), description=description)
+  return task.execute()
+
+
+def summarize_chunk(chunk):
+  return _run_summary(
+      f'Analyze and summarize the content bellow, make sure to include the most relevant information in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}'
+  )
+
+
+def merge_summaries(summaries):
+  """Reduce step: fold the per-chunk summaries of one page into a single summary."""
+  if len(summaries) < 2 or not MERGE_SUMMARIES:
+    return "\n\n".join(summaries)
+  joined = "\n\n".join(
+      f"PART {i}\n----------\n{summary}" for i, summary in enumerate(summaries, start=1))
+  key = "merge:" + _content_hash(joined)
+  merged = summary_cache().get(key)
+  if merged is None:
+    merged = str(_run_summary(
+        f'Merge the partial summaries of one web page bellow into a single summary, keeping every relevant fact, price, date and link and dropping repetition, return only the summary nothing else.\n\n{joined}'
+    ))
+    summary_cache().set(key, merged)
+  return merged
+
+
+def summarize_chunks(chunks):
+  """Map step: summarize chunks concurrently, keeping page order.
+
+  Chunks are deduplicated by content hash and previously summarized
+  content is served from the summary cache, so only new text hits the LLM.
+  """
+  chunks = list(itertools.islice(chunks, MAX_CHUNKS_PER_PAGE))
+  keys = [_content_hash(chunk) for chunk in chunks]
+  summaries = {}
+  missing = {}
+  for key, chunk in zip(keys, chunks):
+    if key in summaries or key in missing:
+      continue
+    cached = summary_cache().get(key)
+    if cached is None:
+      missing[key] = chunk
+    else:
+      summaries[key] = cached
+  if len(missing) == 1:
+    key, chunk = next(iter(missing.items()))
+    summaries[key] = str(summarize_chunk(chunk))
+    summary_cache().set(key, summaries[key])
+  elif missing:
+    fresh = _summary_executor().map(summarize_chunk, missing.values())
+    for key, summary in zip(missing, fresh):
+      summaries[key] = str(summary)
+      summary_cache().set(key, summaries[key])
+  return [summaries[key] for key in keys]
+
+
+def _fetch_html(website):
+  """The browserless response for ``website``, raising rather than returning an error page."""
+  url = f"https://chrome.browserless.io/content?token={os.environ['BROWSERLESS_API_KEY']}"
+  payload = json.dumps({"url": website})
+  headers = {'cache-control': 'no-cache', 'content-type': 'application/json'}
+  response = http_client.post(url, headers=headers, data=payload)
+  # http_client doesn't raise on 4xx/5xx; an error page or an empty body
+  # must not be partitioned and cached as the site's content
+  response.raise_for_status()
+  if not response.text.strip():
+    raise requests.HTTPError(f"Empty page from browserless for {website}", response=response)
+  return response
+
+
+def fetch_page_chunks(website):
+  """Fetch a page through browserless and partition it into text chunks.
+
+  The chunks are cached per URL. Once the entry is stale the page is
+  fetched again, but it is only re-partitioned if the HTML changed
+  (by ETag when browserless sends one, otherwise by content hash). If
+  browserless fails or is rate limited, stale chunks are better than none.
+  """
+  cached = page_cache().get(website)
+  if cached is not None and time.time() - cached["fetched_at"] < PAGE_FRESH_TTL:
+    return cached["chunks"]
+  try:
+    response = _fetch_html(website)
+  except (requests.RequestException, RateLimitTimeout):
+    if cached is not None:
+      return cached["chunks"]
+    raise
+  html_hash = _content_hash(response.text)
+  etag = response.headers.get("ETag")
+  if cached is not None and (
+      (etag and etag == cached.get("etag")) or html_hash == cached.get("html_hash")):
+    chunks = cached["chunks"]
+  else:
+    elements = html_partitioner()(text=response.text)
+    chunks = list(itertools.islice(
+        iter_chunks(elements, max_tokens=CHUNK_TOKENS), MAX_CHUNKS_PER_PAGE))
+  page_cache().set(website, {
+      "chunks": chunks, "html_hash": html_hash, "etag": etag, "fetched_at": time.time()})
+  return chunks
+
+
+def scrape_and_summarize(website):
+  """Summary of a web page: fetch, chunk, summarize the chunks, merge."""
+  try:
+    chunks = fetch_page_chunks(website)
+  except (requests.RequestException, RateLimitTimeout) as e:
+    return f"Sorry, could not scrape {website} ({e})."
+  summaries = summarize_chunks(chunks)
+  return merge_summaries(summaries)
 
 
 class BrowserTools():
@@ -12,27 +222,4 @@ class BrowserTools():
   @tool("Scrape website content")
   def scrape_and_summarize_website(website):
     """Useful to scrape and summarize a website content"""
-    url = f"https://chrome.browserless.io/content?token={os.environ['BROWSERLESS_API_KEY']}"
-    payload = json.dumps({"url": website})
-    headers = {'cache-control': 'no-cache', 'content-type': 'application/json'}
-    response = requests.request("POST", url, headers=headers, data=payload)
-    elements = partition_html(text=response.text)
-    content = "\n\n".join([str(el) for el in elements])
-    content = [content[i:i + 8000] for i in range(0, len(content), 8000)]
-    summaries = []
-    for chunk in content:
-      agent = Agent(
-          role='Principal Researcher',
-          goal=
-          'Do amazing researches and summaries based on the content you are working with',
-          backstory=
-          "You're a Principal Researcher at a big company and you need to do a research about a given topic.",
-          allow_delegation=False)
-      task = Task(
-          agent=agent,
-          description=
-          f'Analyze and summarize the content bellow, make sure to include the most relevant information in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}'
-      )
-      summary = task.execute()
-      summaries.append(summary)
-    return "\n\n".join(summaries)
\ No newline at end of file
+    return traced_call("scrape_and_summarize_website", scrape_and_summarize, website)
@@ -1,5 +1,18 @@
 from langchain.tools import tool
 
+from tools.expression import evaluate_many
+from tracing import traced_call
+
+
+def compute(operation):
+    """Result of one expression, or "expression = result" lines for several."""
+    results = evaluate_many(operation)
+    if not results:
+        return "Error: Invalid syntax in mathematical expression"
+    if len(results) == 1:
+        return results[0][1]
+    return "\n".join(f"{expression} = {value}" for expression, value in results)
+
 class CalculatorTools():
 
     @tool("Make a calculation")
@@ -7,9 +20,9 @@ class CalculatorTools():
         """Useful to perform any mathematical calculations, 
         like sum, minus, multiplication, division, etc.
         The input to this tool should be a mathematical 
-        expression, a couple examples are `200*7` or `5000/2*10`
+        expression, a couple examples are `200*7` or `5000/2*10`.
+        Amounts like `$1,050` are fine, and several budget lines can
+        be computed at once by separating them with `;`, e.g.
+        `150*7; 50*7; 1050+350`
         """
-        try:
-            return eval(operation)
-        except SyntaxError:
-            return "Error: Invalid syntax in mathematical expression"
\ No newline at end of file
+        return traced_call("calculate", compute, operation)
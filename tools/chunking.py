@@ -0,0 +1,130 @@
+import hashlib
+import re
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # optional, fall back to a character estimate
+    tiktoken = None
+
+# Element categories from unstructured that carry no page content
+BOILERPLATE_CATEGORIES = frozenset({
+    "Header", "Footer", "PageBreak", "PageNumber", "Image",
+})
+# Elements shorter than this are navigation crumbs, button labels and the like
+MIN_ELEMENT_CHARS = 3
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_encoding = None
+_stats_lock = threading.Lock()
+_stats = {
+    "pages": 0,
+    "chunks": 0,
+    "elements_in": 0,
+    "elements_dropped": 0,
+    "elements_duplicate": 0,
+    "chars_in": 0,
+    "chars_out": 0,
+    "tokens_in": 0,
+    "tokens_out": 0,
+}
+
+
+def count_tokens(text):
+    """Token count with tiktoken when installed, else ~4 characters per token."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _split_oversized(text, max_tokens):
+    """Split one element that alone exceeds the budget, on sentences if possible."""
+    piece = []
+    piece_tokens = 0
+    for sentence in _SENTENCE_RE.split(text):
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            # A single run-on "sentence": fall back to character slices
+            width = max_tokens * 4
+            for i in range(0, len(sentence), width):
+                yield sentence[i:i + width]
+            continue
+        if piece and piece_tokens + tokens > max_tokens:
+            yield " ".join(piece)
+            piece, piece_tokens = [], 0
+        piece.append(sentence)
+        piece_tokens += tokens
+    if piece:
+        yield " ".join(piece)
+
+
+def iter_chunks(elements, max_tokens=2000):
+    """Pack ``unstructured`` elements into chunks of at most ``max_tokens``.
+
+    Boilerplate categories and repeated elements are dropped and chunks are
+    only cut between elements, so tables and sentences stay whole unless a
+    single element is larger than the budget. Chunks are yielded as soon as
+    they fill up; the counters behind :func:`stats` are updated as you go.
+    """
+    seen = set()
+    buffer = []
+    buffer_tokens = 0
+    counts = dict.fromkeys(_stats, 0)
+    counts["pages"] = 1
+
+    def flush():
+        text = "\n\n".join(buffer)
+        counts["chunks"] += 1
+        counts["chars_out"] += len(text)
+        counts["tokens_out"] += buffer_tokens
+        return text
+
+    try:
+        for element in elements:
+            text = str(element).strip()
+            tokens = count_tokens(text)
+            counts["elements_in"] += 1
+            counts["chars_in"] += len(text)
+            counts["tokens_in"] += tokens
+            category = getattr(element, "category", None)
+            if category in BOILERPLATE_CATEGORIES or len(text) < MIN_ELEMENT_CHARS:
+                counts["elements_dropped"] += 1
+                continue
+            fingerprint = hashlib.sha1(
+                _WHITESPACE_RE.sub(" ", text).lower().encode("utf-8")).digest()
+            if fingerprint in seen:
+                counts["elements_duplicate"] += 1
+                continue
+            seen.add(fingerprint)
+
+            if tokens > max_tokens:
+                pieces = list(_split_oversized(text, max_tokens))
+            else:
+                pieces = [text]
+            for piece in pieces:
+                piece_tokens = count_tokens(piece) if len(pieces) > 1 else tokens
+                if buffer and buffer_tokens + piece_tokens > max_tokens:
+                    yield flush()
+                    buffer, buffer_tokens = [], 0
+                buffer.append(piece)
+                buffer_tokens += piece_tokens
+        if buffer:
+            yield flush()
+    finally:
+        with _stats_lock:
+            for name, value in counts.items():
+                _stats[name] += value
+
+
+def stats():
+    """Totals across every page chunked in this process."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot["chars_removed"] = snapshot["chars_in"] - snapshot["chars_out"]
+    snapshot["tokens_removed"] = snapshot["tokens_in"] - snapshot["tokens_out"]
+    return snapshot
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.environ.get("TOOL_CACHE_PATH", os.path.join(".cache", "tool_cache.sqlite3"))
+
+# Every cache built in this process, by namespace, for stats()
+_caches_lock = threading.Lock()
+_caches = {}
+
+
+class DiskCache:
+    """Persistent JSON key/value cache in SQLite with per-entry TTL.
+
+    Several caches can share one file, each under its own ``namespace``.
+    When a namespace grows past ``max_bytes`` the least recently used
+    entries are evicted. Hit/miss counters are kept per instance.
+    """
+
+    def __init__(self, namespace, path=DEFAULT_PATH, ttl=24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        with _caches_lock:
+            _caches[namespace] = self
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS cache_entries_lru
+                ON cache_entries (namespace, accessed_at)""")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+            if row is None or row[1] < now:
+                self._count("misses")
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key))
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        encoded = json.dumps(value)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO cache_entries
+                (namespace, key, value, size, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (self.namespace, key, encoded, len(encoded), expires_at, now))
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        deleted = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, now)).rowcount
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)).fetchone()[0]
+        if total > self.max_bytes:
+            # Walk entries from least recently used until we are back under budget
+            excess = total - self.max_bytes
+            keys = []
+            for key, size in conn.execute(
+                    "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+                    (self.namespace,)):
+                keys.append((self.namespace, key))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", keys)
+            deleted += len(keys)
+        if deleted:
+            self._count("evictions", deleted)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        row = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)).fetchone()
+        snapshot["entries"], snapshot["bytes"] = row
+        return snapshot
+
+
+def stats():
+    """Per-namespace counters and sizes of the caches built in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.namespace: cache.stats() for cache in caches}
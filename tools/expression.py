@@ -0,0 +1,150 @@
+import ast
+import operator
+import re
+from functools import lru_cache
+
+# Largest integer, in bits, that '**' and '*' may produce. Bounding the
+# result rather than the exponent is what stops "((9**99)**99)**99" from
+# stalling a worker; floats overflow quickly instead.
+MAX_INT_BITS = 4096
+
+
+def _check_bits(bits):
+    if bits > MAX_INT_BITS:
+        raise ExpressionError(f"Result would exceed {MAX_INT_BITS} bits")
+
+
+def _power(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        _check_bits(base.bit_length() * exponent)
+    return operator.pow(base, exponent)
+
+
+def _multiply(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        _check_bits(left.bit_length() + right.bit_length())
+    return operator.mul(left, right)
+
+
+def _round(number, ndigits=None):
+    # round(5, -10**9) would compute 10**(10**9)
+    if ndigits is not None and abs(ndigits) > MAX_INT_BITS:
+        raise ExpressionError(f"round() to {ndigits} digits is out of range")
+    return round(number, ndigits)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+_FUNCTIONS = {
+    "abs": abs,
+    "round": _round,
+    "min": min,
+    "max": max,
+}
+
+_CURRENCY_RE = re.compile(r"(?:[$€£¥₹]|\b(?:USD|EUR|GBP)\b)\s*", re.IGNORECASE)
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+# "150 x 2" as in the budget line format, between numbers only
+_TIMES_RE = re.compile(r"(?<=[\d)])\s*[xX]\s*(?=[\d(.])")
+# "15%" as a percentage, but not the modulo in "10 % 3"
+_PERCENT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%(?!\s*[\d(.])")
+_SEPARATOR_RE = re.compile(r"[;\n]+")
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that aren't plain arithmetic."""
+
+
+def _strip_thousands(text):
+    """Drop thousands separators, but not the commas between call arguments."""
+    argument_commas = set()
+    calls = []
+    for index, char in enumerate(text):
+        if char == "(":
+            before = text[:index].rstrip()[-1:]
+            calls.append(before.isalpha() or before == "_")
+        elif char == ")" and calls:
+            calls.pop()
+        elif char == "," and calls and calls[-1]:
+            argument_commas.add(index)
+    return _THOUSANDS_RE.sub(
+        lambda match: match.group(0) if match.start() in argument_commas else "", text)
+
+
+def normalize_expression(text):
+    """Turn LLM-style arithmetic ("$1,050 × 2") into Python syntax ("1050 * 2")."""
+    text = _CURRENCY_RE.sub("", text)
+    text = _strip_thousands(text)
+    text = _PERCENT_RE.sub(r"(\1/100)", text)
+    text = text.replace("×", "*").replace("÷", "/").replace("^", "**")
+    text = _TIMES_RE.sub(" * ", text)
+    return text.strip().rstrip("=").strip()
+
+
+def _compile_node(node):
+    """Build a closure evaluating ``node``, rejecting anything but arithmetic."""
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported constant: {node.value!r}")
+        value = node.value
+        return lambda: value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        op = _BINARY_OPERATORS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda: op(left(), right())
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        op = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda: op(operand())
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id in _FUNCTIONS and not node.keywords):
+        fn = _FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda: fn(*(arg() for arg in args))
+    raise ExpressionError(f"Unsupported expression element: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(text):
+    """Parse and compile a normalized expression; cached per expression string."""
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError("Invalid syntax in mathematical expression") from e
+    return _compile_node(tree)
+
+
+def evaluate(text):
+    """Evaluate one arithmetic expression such as "$150 × 7 + 50"."""
+    return compile_expression(normalize_expression(text))()
+
+
+def evaluate_many(text):
+    """Evaluate ';' or newline separated expressions, returning (expression, result) pairs.
+
+    A failing expression yields its error message instead of a number so
+    the other results are still returned.
+    """
+    results = []
+    for expression in _SEPARATOR_RE.split(text):
+        expression = expression.strip()
+        if not expression:
+            continue
+        try:
+            results.append((expression, evaluate(expression)))
+        except (ExpressionError, ArithmeticError, TypeError) as e:
+            results.append((expression, f"Error: {e}"))
+    return results
@@ -0,0 +1,180 @@
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+import rate_limit
+import replay
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 60))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.5))
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 10))
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Query parameters holding credentials, left out of replay fixtures
+SECRET_PARAMS = frozenset({"token", "key", "api_key"})
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_counters = {"requests": 0, "retries": 0, "errors": 0}
+
+
+def _incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+class _CountingRetry(Retry):
+    """urllib3 Retry that records every retry attempt in the shared counters.
+
+    A 429 also pauses the upstream's rate limiter, so other requests wait
+    out the Retry-After instead of running into the limit as well.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        _incr("retries")
+        if response is not None and response.status == 429 and _pool is not None:
+            limiter = rate_limit.for_host(_pool.host)
+            if limiter is not None:
+                limiter.throttled(response.headers.get("Retry-After"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _build_session():
+    retry = _CountingRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        # Serper and browserless are both POST APIs without side effects
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """The process-wide pooled session, rebuilt after a fork."""
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = _build_session()
+            _session_pid = os.getpid()
+        return _session
+
+
+def _send(method, url, timeout=None, **kwargs):
+    limiter = rate_limit.for_url(url)
+    if limiter is None:
+        return _send_now(method, url, timeout, **kwargs)
+    with limiter.slot():
+        response = _send_now(method, url, timeout, **kwargs)
+    if response.status_code == 429:
+        # Still limited after the retries
+        limiter.throttled(response.headers.get("Retry-After"))
+    return response
+
+
+def _send_now(method, url, timeout=None, **kwargs):
+    session = get_session()
+    _incr("requests")
+    try:
+        return session.request(
+            method, url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs
+        )
+    except requests.RequestException:
+        _incr("errors")
+        raise
+
+
+def _fixture_request(method, url, kwargs):
+    """What identifies a request in replay fixtures: no headers, no secrets."""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query)
+             if name not in SECRET_PARAMS]
+    body = kwargs.get("data")
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    return {
+        "method": method.upper(),
+        "url": urlunsplit(parts._replace(query=urlencode(query))),
+        "params": kwargs.get("params"),
+        "body": body if body is not None else kwargs.get("json"),
+    }
+
+
+def _to_fixture(response):
+    return {
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "text": response.text,
+    }
+
+
+def _from_fixture(fixture, url):
+    response = requests.Response()
+    response.status_code = fixture["status"]
+    response.headers = CaseInsensitiveDict(fixture["headers"])
+    response._content = fixture["text"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+def request(method, url, timeout=None, **kwargs):
+    """Send a request over the shared session with default timeouts and retries.
+
+    Requests to a rate limited upstream (see :mod:`rate_limit`) wait for
+    a slot first and raise RateLimitTimeout if none comes in time.
+
+    Under REPLAY_MODE the response is recorded to, or served from, a
+    replay fixture; see :mod:`replay`.
+    """
+    if not replay.enabled():
+        return _send(method, url, timeout, **kwargs)
+    fixture = replay.call(
+        "http", _fixture_request(method, url, kwargs),
+        lambda: _to_fixture(_send(method, url, timeout, **kwargs)))
+    return _from_fixture(fixture, url)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def stats():
+    """Request, retry and connection-reuse counters for this process."""
+    with _lock:
+        snapshot = dict(_counters)
+        session = _session if _session_pid == os.getpid() else None
+    connections = 0
+    pool_requests = 0
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+    snapshot["connections_opened"] = connections
+    snapshot["pool_hits"] = max(0, pool_requests - connections)
+    return snapshot
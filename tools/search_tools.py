@@ -1,37 +1,98 @@
 import json
 import os
+import re
+import threading
 
 import requests
 from langchain.tools import tool
 
+from rate_limit import RateLimitTimeout
+from tools import http_client
+from tools.disk_cache import DiskCache
+from tracing import traced_call
 
-class SearchTools():
+# Returned when Serper keeps answering 429: saying so stops the agent from
+# re-searching as it would after "couldn't find anything"
+RATE_LIMITED_MESSAGE = (
+    "Sorry, the search is rate limited right now. Continue with the "
+    "information you already have instead of searching again.")
 
-  @tool("Search the internet")
-  def search_internet(query):
-    """Useful to search the internet
-    about a a given topic and return relevant results"""
-    top_result_to_return = 4
+# Serve searches only from the on-disk cache (no Serper calls), e.g. in tests
+SEARCH_OFFLINE = os.environ.get("SEARCH_OFFLINE", "").lower() in ("1", "true", "yes")
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_cache_lock = threading.Lock()
+_search_cache = None
+
+
+def normalize_query(query):
+  """Cache key for a query: case, punctuation and spacing don't matter."""
+  query = _NON_WORD_RE.sub(" ", query.lower())
+  return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+def search_cache():
+  """The shared Serper result cache, see SEARCH_CACHE_TTL / SEARCH_CACHE_MAX_BYTES."""
+  global _search_cache
+  with _cache_lock:
+    if _search_cache is None:
+      _search_cache = DiskCache(
+          "serper_search",
+          ttl=int(os.environ.get("SEARCH_CACHE_TTL", 24 * 3600)),
+          max_bytes=int(os.environ.get("SEARCH_CACHE_MAX_BYTES", 50 * 1024 * 1024)))
+    return _search_cache
+
+
+def run_search(query):
+  """Top Serper results for ``query`` as text, served from the cache when possible."""
+  top_result_to_return = 4
+  cache_key = normalize_query(query)
+  data = search_cache().get(cache_key)
+  if data is None and SEARCH_OFFLINE:
+    return "Sorry, I couldn't find anything about that, search is running in offline mode."
+  if data is None:
     url = "https://google.serper.dev/search"
     payload = json.dumps({"q": query})
     headers = {
         'X-API-KEY': os.environ['SERPER_API_KEY'],
         'content-type': 'application/json'
     }
-    response = requests.request("POST", url, headers=headers, data=payload)
-    # check if there is an organic key
-    if 'organic' not in response.json():
-      return "Sorry, I couldn't find anything about that, there could be an error with you serper api key."
-    else:
-      results = response.json()['organic']
-      string = []
-      for result in results[:top_result_to_return]:
-        try:
-          string.append('\n'.join([
-              f"Title: {result['title']}", f"Link: {result['link']}",
-              f"Snippet: {result['snippet']}", "\n-----------------"
-          ]))
-        except KeyError:
-          next
-
-      return '\n'.join(string)
\ No newline at end of file
+    try:
+      response = http_client.post(url, headers=headers, data=payload)
+      if response.status_code == 429:
+        return RATE_LIMITED_MESSAGE
+      data = response.json()
+    except RateLimitTimeout:
+      return RATE_LIMITED_MESSAGE
+    except (requests.RequestException, ValueError) as e:
+      return f"Sorry, the search failed ({e}), try again later."
+    # Only cache successful searches so a bad key or quota error isn't sticky
+    if 'organic' in data:
+      search_cache().set(cache_key, {'organic': data['organic']})
+  # check if there is an organic key
+  if 'organic' not in data:
+    return "Sorry, I couldn't find anything about that, there could be an error with you serper api key."
+  else:
+    results = data['organic']
+    string = []
+    for result in results[:top_result_to_return]:
+      try:
+        string.append('\n'.join([
+            f"Title: {result['title']}", f"Link: {result['link']}",
+            f"Snippet: {result['snippet']}", "\n-----------------"
+        ]))
+      except KeyError:
+        next
+
+    return '\n'.join(string)
+
+
+class SearchTools():
+
+  @tool("Search the internet")
+  def search_internet(query):
+    """Useful to search the internet
+    about a a given topic and return relevant results"""
+    return traced_call("search_internet", run_search, query)
@@ -0,0 +1,123 @@
+"""Timing spans for one trip planning job.
+
+The crew side (a worker thread or a crew_pool worker process) activates a
+:class:`JobTrace` around the crew; tool calls made while it is active are
+timed by :func:`traced_call` and reported as ``{"type": "span"}`` events
+through the job's regular ``on_event`` channel. The API side folds those
+events into a :class:`JobTimings` breakdown.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("job_trace", default=None)
+
+
+class JobTrace:
+    """Forwards spans of the running job to ``on_event``."""
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.started = time.monotonic()
+
+    def record(self, kind, name, duration, **attrs):
+        if self.on_event is None:
+            return
+        self.on_event(dict(
+            type="span", kind=kind, name=name, duration_s=round(duration, 6),
+            offset_s=round(time.monotonic() - self.started - duration, 6), **attrs))
+
+
+@contextmanager
+def activate(trace):
+    """Make ``trace`` the current trace in this context."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def record_span(kind, name, duration, **attrs):
+    """Record a span on the current trace, if there is one."""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(kind, name, duration, **attrs)
+
+
+def _size(*values):
+    return sum(len(str(value).encode("utf-8")) for value in values)
+
+
+def traced_call(name, fn, *args):
+    """Call ``fn(*args)``, recording a "tool" span with its latency and bytes."""
+    trace = _current.get()
+    if trace is None:
+        return fn(*args)
+    start = time.monotonic()
+    try:
+        result = fn(*args)
+    except Exception:
+        trace.record("tool", name, time.monotonic() - start, outcome="error",
+                     bytes_in=_size(*args))
+        raise
+    trace.record("tool", name, time.monotonic() - start, outcome="ok",
+                 bytes_in=_size(*args), bytes_out=_size(result))
+    return result
+
+
+class JobTimings:
+    """Where a job's time went: queue wait, each task, each tool and rate limit waits."""
+
+    def __init__(self, queue_wait=None):
+        self.queue_wait = queue_wait
+        self.started = time.monotonic()
+        self.finished = None
+        self.first_output = None
+        self.tasks = {}
+        self.tools = {}
+        self.rate_limit_waits = {}
+        self._lock = threading.Lock()
+
+    def add_task(self, name, duration):
+        with self._lock:
+            self.tasks[name] = round(self.tasks.get(name, 0) + duration, 3)
+
+    def add_span(self, span):
+        with self._lock:
+            tool = self.tools.setdefault(span["name"], {
+                "calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0,
+                "bytes_in": 0, "bytes_out": 0})
+            tool["calls"] += 1
+            tool["errors"] += span.get("outcome") == "error"
+            tool["total_s"] = round(tool["total_s"] + span["duration_s"], 3)
+            tool["max_s"] = round(max(tool["max_s"], span["duration_s"]), 3)
+            tool["bytes_in"] += span.get("bytes_in", 0)
+            tool["bytes_out"] += span.get("bytes_out", 0)
+
+    def add_rate_limit_wait(self, upstream, duration):
+        with self._lock:
+            wait = self.rate_limit_waits.setdefault(upstream, {"waits": 0, "total_s": 0.0})
+            wait["waits"] += 1
+            wait["total_s"] = round(wait["total_s"] + duration, 3)
+
+    def mark_first_output(self):
+        """Note when the first itinerary text arrived; returns seconds since the start."""
+        self.first_output = time.monotonic() - self.started
+        return self.first_output
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def to_dict(self):
+        end = self.finished or time.monotonic()
+        with self._lock:
+            return {
+                "queue_wait_s": None if self.queue_wait is None else round(self.queue_wait, 3),
+                "run_s": round(end - self.started, 3),
+                "first_output_s": None if self.first_output is None else round(self.first_output, 3),
+                "tasks": dict(self.tasks),
+                "tools": {name: dict(tool) for name, tool in self.tools.items()},
+                "rate_limit_waits": {name: dict(wait) for name, wait in self.rate_limit_waits.items()},
+            }
@@ -1,47 +1,68 @@
 # trip_agents.py
 from crewai import Agent
-from langchain_community.llms import OpenAI
 
+from llm_registry import get_llm
 from tools.browser_tools import BrowserTools
 from tools.calculator_tools import CalculatorTools
 from tools.search_tools import SearchTools
 
+# Agent definitions, built once; each crew gets its own Agent instances
+# because crewai binds an agent to the crew running it
+AGENT_SPECS = {
+    "city_selection_agent": dict(
+        role='City Selection Expert',
+        goal='Select the best city based on weather, season, and prices',
+        backstory='An expert in analyzing travel data to pick ideal destinations',
+        tools=(
+            SearchTools.search_internet,
+            BrowserTools.scrape_and_summarize_website,
+        )),
+    "local_expert": dict(
+        role='Local Expert at this city',
+        goal='Provide the BEST insights about the selected city',
+        backstory="""A knowledgeable local guide with extensive information
+            about the city, it's attractions and customs""",
+        tools=(
+            SearchTools.search_internet,
+            BrowserTools.scrape_and_summarize_website,
+        )),
+    "travel_concierge": dict(
+        role='Amazing Travel Concierge',
+        goal="""Create the most amazing travel itineraries with budget and
+            packing suggestions for the city, including optimal transportation logistics""",
+        backstory="""Specialist in travel planning and logistics with
+            decades of experience, adept at finding the best transportation options
+            like flights, trains, buses, and car rentals for any trip""",
+        tools=(
+            SearchTools.search_internet,
+            CalculatorTools.calculate,
+            BrowserTools.scrape_and_summarize_website,
+        ),
+        # Its final answer is the itinerary, streamed to the job as it's written
+        streaming=True),
+}
+
 class TripAgents():
-    def city_selection_agent(self):
-        return Agent(
-            role='City Selection Expert',
-            goal='Select the best city based on weather, season, and prices',
-            backstory='An expert in analyzing travel data to pick ideal destinations',
-            tools=[
-                SearchTools.search_internet,
-                BrowserTools.scrape_and_summarize_website,
-            ],
-            verbose=True)
+    """Builds the crew's agents from AGENT_SPECS around one shared LLM client."""
+
+    def __init__(self, llm=None):
+        self.llm = llm
 
-    def local_expert(self):   
+    def _agent(self, name):
+        spec = AGENT_SPECS[name]
         return Agent(
-            role='Local Expert at this city',
-            goal='Provide the BEST insights about the selected city',
-            backstory="""A knowledgeable local guide with extensive information
-            about the city, it's attractions and customs""",
-            tools=[
-                SearchTools.search_internet,
-                BrowserTools.scrape_and_summarize_website,
-            ],
+            role=spec["role"],
+            goal=spec["goal"],
+            backstory=spec["backstory"],
+            tools=list(spec["tools"]),
+            llm=self.llm or get_llm(streaming=spec.get("streaming", False)),
             verbose=True)
 
+    def city_selection_agent(self):
+        return self._agent("city_selection_agent")
+
+    def local_expert(self):
+        return self._agent("local_expert")
+
     def travel_concierge(self):
-        return Agent(
-            role='Amazing Travel Concierge',
-            goal="""Create the most amazing travel itineraries with budget and 
-            packing suggestions for the city, including optimal transportation logistics""",
-            backstory="""Specialist in travel planning and logistics with 
-            decades of experience, adept at finding the best transportation options 
-            like flights, trains, buses, and car rentals for any trip""",
-            tools=[
-                SearchTools.search_internet,
-                CalculatorTools.calculate,
-                BrowserTools.scrape_and_summarize_website,
-            ],
-            verbose=True
-        )
\ No newline at end of file
+        return self._agent("travel_concierge")
@@ -0,0 +1,67 @@
+"""The trip planning pipeline for one request, free of API state.
+
+Runs the same way in an API worker thread or in a crew_pool worker
+process: crew, budget computation, itinerary parsing and text cleaning.
+The crew (crewai, langchain, unstructured) is imported on the first job
+or by :func:`warmup`, so importing the API stays cheap.
+"""
+import logging
+
+from budget import apply_budget
+from clean_result import clean_result
+from itinerary import BudgetLine, parse_itinerary
+from prompts import DEFAULT_PROFILE
+from token_stream import TokenSink, activate as stream_tokens
+from tracing import JobTrace, activate
+
+
+def warmup():
+    """Import the crew and build its templates now rather than on the first job."""
+    import main
+    main.warmup()
+
+
+def run_trip(location, cities, date_range, interests, prompt_profile=None, on_event=None):
+    """Plan a trip.
+
+    Returns the cleaned result, the structured itinerary dict and the
+    crew's token usage dict.
+    """
+    from main import TripCrew
+
+    trip_crew = TripCrew(location, cities, date_range, interests,
+                         prompt_profile=prompt_profile or DEFAULT_PROFILE)
+    # Tool calls made by the crew are reported to on_event as "span" events,
+    # the itinerary as "partial" events while the concierge writes it
+    with activate(JobTrace(on_event)), stream_tokens(TokenSink(on_event)):
+        result = trip_crew.run(on_event=on_event)
+    usage = trip_crew.usage.to_dict() if trip_crew.usage is not None else None
+
+    # Log the raw result for debugging
+    logging.debug(f"Raw result from TripCrew.run(): {result}")
+
+    # Ensure result is JSON serializable
+    if result is None:
+        result = {"message": "No result generated"}
+
+    # Try to convert result to string if it's not already
+    if not isinstance(result, (str, dict)):
+        result = str(result)
+
+    # Compute the budget breakdown from the line items, parse the structured
+    # itinerary from the raw markdown, then clean the text
+    itinerary = None
+    if isinstance(result, str):
+        result, budget_summary = apply_budget(result, date_range)
+        parsed = parse_itinerary(result)
+        if budget_summary is not None:
+            # The computed line items are exact; don't re-parse the rendered text
+            parsed.budget = [
+                BudgetLine(
+                    description=item["description"], amount=item["amount"],
+                    day=item["day"], category=item["category"])
+                for item in budget_summary.pop("items")
+            ]
+            parsed.budget_summary = budget_summary
+        itinerary = parsed.to_dict()
+    return clean_result(result), itinerary, usage
@@ -0,0 +1,706 @@
+"""Framework-independent core of the trip planning API.
+
+The Flask app in api.py and the ASGI app in asgi.py are thin adapters over
+these functions, which return ``(payload, status_code, headers)`` tuples.
+"""
+# Standard library imports
+from datetime import datetime
+import json
+from uuid import uuid4
+import logging
+import os
+import time
+import traceback
+
+# Third-party imports
+from dateutil.parser import parse
+
+# Local imports
+from clean_result import PartialResult
+from crew_pool import crew_pool_from_env
+from itinerary import FIELDS as ITINERARY_FIELDS, Itinerary
+from job_store import job_store_from_env
+from metrics import REGISTRY
+from result_cache import result_cache_from_env, trip_cache_key
+from scheduler import QueueFullError, SchedulerClosedError, scheduler_from_env
+from prompts import DEFAULT_PROFILE, PROFILES
+import rate_limit
+from tools import chunking, disk_cache, http_client
+from tracing import JobTimings
+from trip_runner import run_trip, warmup as warmup_crew
+
+# Browser origins allowed to call the API - updated with quipit.ai domains
+ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "https://quipitnextjs.vercel.app",
+    "https://quipit.ai",
+    "https://www.quipit.ai"
+]
+
+# Job statuses and results; in-memory by default, see JOB_STORE for SQLite
+job_store = job_store_from_env()
+# Batches get their own store so a batch id can't be read as a job and
+# batch records don't count against the jobs' capacity
+batch_store = job_store_from_env("batches", "batch_events")
+
+# Bounded worker pool + admission queue; see CREW_MAX_WORKERS / CREW_MAX_QUEUE_SIZE
+scheduler = scheduler_from_env()
+# Worker processes the crews run in when CREW_BACKEND=process, else None
+crew_pool = crew_pool_from_env()
+# Seconds clients are asked to wait before retrying when the queue is full
+QUEUE_RETRY_AFTER = int(os.environ.get("CREW_QUEUE_RETRY_AFTER", 30))
+
+# Load the crew when the server starts instead of on the first job
+PRELOAD = os.environ.get("CREW_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+# Cleaned results of recent identical requests; see RESULT_CACHE_TTL
+result_cache = result_cache_from_env()
+
+# How often the SSE stream checks the job store, and how often it sends keep-alives
+STREAM_POLL_INTERVAL = float(os.environ.get("STREAM_POLL_INTERVAL", 0.5))
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get("STREAM_HEARTBEAT_INTERVAL", 15))
+
+# Memory cap on the live itinerary text kept per running job
+PARTIAL_RESULT_MAX_CHARS = int(os.environ.get("PARTIAL_RESULT_MAX_CHARS", 32 * 1024))
+# Least seconds between job store writes of that text; each write rewrites
+# all of it, which with the SQLite store is a large row update
+PARTIAL_STORE_INTERVAL = float(os.environ.get("PARTIAL_STORE_INTERVAL", 1.0))
+
+# Seconds a result cache claim must be held before a request may take it
+# over from a job missing from the store (it is stored right after claiming)
+CLAIM_TAKEOVER_AGE = 5
+
+# Largest batch accepted by POST /api/crew/batch, and the queue priority of
+# its items (lower runs first; single requests default to 0)
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 32))
+BATCH_PRIORITY = int(os.environ.get("BATCH_PRIORITY", 10))
+# Event index past any job's events: batch status reads skip the event log
+BATCH_NO_EVENTS = 2 ** 62
+
+# Exposed on /metrics; see metrics_text()
+JOBS = REGISTRY.counter(
+    "trip_jobs_total", "Trip requests by outcome", labels=("outcome",))
+FIRST_OUTPUT = REGISTRY.histogram(
+    "trip_job_first_output_seconds", "Time from a job starting to its first itinerary text",
+    buckets=(5, 10, 30, 60, 120, 180, 300, 600))
+QUEUE_WAIT = REGISTRY.histogram(
+    "trip_job_queue_wait_seconds", "Time jobs waited for a crew worker",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600))
+JOB_DURATION = REGISTRY.histogram(
+    "trip_job_duration_seconds", "Time from a job starting to its result",
+    labels=("status",), buckets=(10, 30, 60, 120, 180, 300, 450, 600, 900, 1800))
+TASK_DURATION = REGISTRY.histogram(
+    "trip_task_duration_seconds", "Duration of crew tasks", labels=("task",),
+    buckets=(1, 5, 10, 30, 60, 120, 180, 300, 600))
+TOOL_DURATION = REGISTRY.histogram(
+    "trip_tool_call_duration_seconds", "Latency of agent tool calls", labels=("tool",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+TOOL_CALLS = REGISTRY.counter(
+    "trip_tool_calls_total", "Agent tool calls by outcome", labels=("tool", "outcome"))
+TOOL_BYTES = REGISTRY.counter(
+    "trip_tool_bytes_total", "Bytes of tool input and output", labels=("tool", "direction"))
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "trip_rate_limit_wait_seconds", "Time upstream calls queued for their rate limiter",
+    labels=("upstream",), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+LLM_TOKENS = REGISTRY.counter(
+    "trip_llm_tokens_total", "LLM tokens used by crews", labels=("kind", "profile"))
+REUSED_TASKS = REGISTRY.counter(
+    "trip_reused_tasks_total", "Crew tasks served from the city knowledge cache",
+    labels=("task",))
+REGISTRY.gauge(
+    "trip_scheduler_jobs", "Jobs running or waiting in the scheduler",
+    lambda: {(state,): scheduler.stats()[state] for state in ("running", "queued")},
+    labels=("state",))
+# Only counts requests made in this process, i.e. with the thread backend
+REGISTRY.gauge(
+    "trip_http_client_events", "Outbound HTTP requests, retries, errors and connections",
+    lambda: {(name,): value for name, value in http_client.stats().items()},
+    labels=("event",))
+# Likewise only this process's limiters
+REGISTRY.gauge(
+    "trip_rate_limiter", "Upstream rate limiter requests, 429s, timeouts, queue and in flight",
+    lambda: {(upstream, name): value
+             for upstream, counters in rate_limit.stats().items()
+             for name, value in counters.items()},
+    labels=("upstream", "stat"))
+# Likewise: tool caches, and the characters and tokens chunking cut from pages
+REGISTRY.gauge(
+    "trip_tool_cache", "Tool and city knowledge cache hits, misses, evictions, entries and bytes",
+    lambda: {(namespace, name): value
+             for namespace, counters in disk_cache.stats().items()
+             for name, value in counters.items()},
+    labels=("namespace", "stat"))
+REGISTRY.gauge(
+    "trip_page_chunking", "Pages, chunks, elements, characters and tokens seen by the chunker",
+    lambda: {(name,): value for name, value in chunking.stats().items()},
+    labels=("stat",))
+REGISTRY.gauge(
+    "trip_crew_pool", "Crew worker process jobs, failures, replacements and idle workers",
+    lambda: {} if crew_pool is None else {
+        (name,): value for name, value in crew_pool.stats().items()},
+    labels=("stat",))
+
+def metrics_text():
+    """All metrics in the Prometheus text format, for the /metrics endpoint."""
+    return REGISTRY.render()
+
+class _StoredPartial(PartialResult):
+    """A job's PartialResult, written to the job store at most every ``interval``."""
+
+    def __init__(self, max_chars, interval):
+        super().__init__(max_chars)
+        self.interval = interval
+        self._stored_at = float("-inf")
+
+    def store_due(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._stored_at < self.interval:
+            return False
+        self._stored_at = now
+        return True
+
+def _relay_event(job_id, timings, partial, event):
+    """Record a crew event: spans feed timings and metrics, partial output
+    the job's live result, the rest is progress."""
+    if isinstance(event, dict) and event.get("type") == "span" and event.get("kind") == "rate_limit":
+        timings.add_rate_limit_wait(event["name"], event["duration_s"])
+        RATE_LIMIT_WAIT.observe(event["duration_s"], upstream=event["name"])
+        return
+    if isinstance(event, dict) and event.get("type") == "span":
+        timings.add_span(event)
+        TOOL_DURATION.observe(event["duration_s"], tool=event["name"])
+        TOOL_CALLS.inc(tool=event["name"], outcome=event.get("outcome", "ok"))
+        TOOL_BYTES.inc(event.get("bytes_in", 0), tool=event["name"], direction="in")
+        TOOL_BYTES.inc(event.get("bytes_out", 0), tool=event["name"], direction="out")
+        return
+    if isinstance(event, dict) and event.get("type") == "task_finished" and "duration_s" in event:
+        # research_task:<city> is one label, not one per city
+        task = event["task"].split(":", 1)[0]
+        timings.add_task(event["task"], event["duration_s"])
+        TASK_DURATION.observe(event["duration_s"], task=task)
+        job_store.update(job_id, event=event, timings=timings.to_dict())
+        return
+    if isinstance(event, dict) and event.get("type") == "partial":
+        if event.get("reset"):
+            partial.reset()
+        partial.feed(event.get("text", ""))
+        first_output = partial.received and timings.first_output is None
+        # The first text and a restart show at once, the rest at most every interval
+        if not partial.store_due(force=first_output or event.get("reset", False)):
+            return
+        fields = {"partial": partial.to_dict()}
+        if first_output:
+            FIRST_OUTPUT.observe(timings.mark_first_output())
+            fields["timings"] = timings.to_dict()
+        job_store.update(job_id, **fields)
+        return
+    job_store.append_event(job_id, event)
+
+def warmup():
+    """Start the crew worker processes, or load the crew into this process."""
+    if crew_pool is not None:
+        crew_pool.start()
+    else:
+        warmup_crew()
+
+def kickoff_trip_planning(job_id, location, cities, date_range, interests, cache_key=None,
+                          prompt_profile=DEFAULT_PROFILE, submitted_at=None):
+    """Run the trip planning process in a separate thread.
+
+    With CREW_BACKEND=process the crew itself runs in a crew_pool worker
+    and this thread only relays its events and result into the job store.
+    """
+    queue_wait = None if submitted_at is None else time.monotonic() - submitted_at
+    timings = JobTimings(queue_wait)
+    # The itinerary as the concierge writes it, until the result replaces it
+    partial = _StoredPartial(PARTIAL_RESULT_MAX_CHARS, PARTIAL_STORE_INTERVAL)
+    if queue_wait is not None:
+        QUEUE_WAIT.observe(queue_wait)
+    status = "error"
+    try:
+        logging.info(f"Starting trip planning for job {job_id}")
+        job_store.update(
+            job_id, event="Trip planning picked up by a worker", timings=timings.to_dict())
+        logging.debug(f"Input parameters: location={location}, cities={cities}, "
+                     f"date_range={date_range}, interests={interests}")
+
+        on_event = lambda event: _relay_event(job_id, timings, partial, event)
+        trip = (location, cities, date_range, interests, prompt_profile)
+        if crew_pool is not None:
+            cleaned_result, itinerary, usage = crew_pool.run(run_trip, trip, on_event)
+        else:
+            cleaned_result, itinerary, usage = run_trip(*trip, on_event=on_event)
+        if usage is not None:
+            LLM_TOKENS.inc(usage.get("prompt_tokens", 0), kind="prompt", profile=prompt_profile)
+            LLM_TOKENS.inc(usage.get("completion_tokens", 0), kind="completion", profile=prompt_profile)
+            for task in usage.get("reused_tasks", ()):
+                REUSED_TASKS.inc(task=task)
+            logging.info(f"Job {job_id} used {usage['prompt_tokens']} prompt and "
+                         f"{usage['completion_tokens']} completion tokens")
+        if cache_key is not None:
+            result_cache.set(cache_key, {"result": cleaned_result, "itinerary": itinerary})
+
+        status = "completed"
+        timings.finish()
+        job_store.update(
+            job_id,
+            status="completed",
+            result=cleaned_result,
+            itinerary=itinerary,
+            usage=usage,
+            partial=None,
+            timings=timings.to_dict(),
+            event="Trip planning completed successfully"
+        )
+
+        logging.info(f"Successfully completed trip planning for job {job_id}")
+
+    except Exception as e:
+        error_msg = f"Error in trip planning: {str(e)}\n{traceback.format_exc()}"
+        logging.error(error_msg)
+
+        timings.finish()
+        job_store.update(
+            job_id,
+            status="error",
+            result={"error": str(e)},
+            partial=None,
+            timings=timings.to_dict(),
+            event=f"Error occurred: {str(e)}"
+        )
+
+    finally:
+        JOBS.inc(outcome=status)
+        JOB_DURATION.observe(time.monotonic() - timings.started, status=status)
+        if cache_key is not None:
+            result_cache.release(cache_key, job_id)
+
+def validate_trip(data):
+    """Error message for an invalid trip request, None if it is valid."""
+    if not isinstance(data, dict):
+        return "Request body must be a JSON object"
+
+    # Validate required fields
+    required_fields = ['location', 'cities', 'date_range', 'interests']
+    for field in required_fields:
+        if field not in data:
+            return f"Missing required field: {field}"
+        if not isinstance(data[field], str):
+            return f"{field} must be a string"
+
+    # Validate date range format
+    try:
+        start_date, end_date = data['date_range'].split(" to ")
+        parse(start_date)
+        parse(end_date)
+    except (ValueError, AttributeError, OverflowError):
+        return "Invalid date range format. Expected 'DD/MM/YYYY to DD/MM/YYYY'"
+
+    # Optional prompt profile, see prompts.PROFILES
+    if data.get('prompt_profile', DEFAULT_PROFILE) not in PROFILES:
+        return f"prompt_profile must be one of: {', '.join(PROFILES)}"
+
+    # Optional scheduling priority, lower runs first. 0, the default, is the
+    # highest a client may ask for: a request can only yield its turn
+    priority = data.get('priority', 0)
+    if not isinstance(priority, int) or isinstance(priority, bool) or priority < 0:
+        return "priority must be a non-negative integer"
+    return None
+
+def _request_cache_key(data):
+    try:
+        return trip_cache_key(
+            data['location'], data['cities'], data['date_range'], data['interests'],
+            data.get('prompt_profile', DEFAULT_PROFILE)
+        )
+    except (ValueError, OverflowError):
+        return None
+
+def _reuse_trip(job_id, cache_key):
+    """Serve a validated request from the result cache or an identical
+    in-flight job. Returns the response, or None if a new job must run
+    (``job_id`` then owns ``cache_key``)."""
+    cached_result = result_cache.get(cache_key) if cache_key else None
+    if cached_result is not None:
+        logging.info(f"Serving job {job_id} from the result cache")
+        JOBS.inc(outcome="cached")
+        job_store.create(job_id, {
+            "status": "completed",
+            "result": cached_result["result"],
+            "itinerary": cached_result["itinerary"],
+            "events": [{
+                "timestamp": datetime.now().isoformat(),
+                "data": "Trip plan served from cache"
+            }]
+        })
+        # Same 202 contract as a new job; the client polls and finds it completed
+        return {
+            "job_id": job_id,
+            "status": "Trip planning started",
+            "message": "Served a cached trip plan",
+            "queue_position": None,
+            "cached": True
+        }, 202, {}
+
+    # Coalesce onto an identical request that is still being planned
+    in_flight_job_id = result_cache.claim(cache_key, job_id) if cache_key else None
+    while in_flight_job_id is not None:
+        # Take the key over from a job that is gone from the store, unless
+        # another request beat us to it; a job claimed only a moment ago may
+        # just not have been stored yet
+        if job_store.get(in_flight_job_id) is None and result_cache.replace(
+                cache_key, in_flight_job_id, job_id, min_age=CLAIM_TAKEOVER_AGE):
+            return None
+        current = result_cache.claim(cache_key, job_id)
+        if current == in_flight_job_id:
+            logging.info(f"Coalescing request onto in-flight job {in_flight_job_id}")
+            JOBS.inc(outcome="coalesced")
+            return {
+                "job_id": in_flight_job_id,
+                "status": "Trip planning started",
+                "message": "Joined an identical trip plan already in progress",
+                "queue_position": scheduler.queue_position(in_flight_job_id)
+            }, 202, {}
+        in_flight_job_id = current
+    return None
+
+def _create_job(job_id, data, cache_key):
+    """Store a new in-progress job; returns its scheduler arguments."""
+    job_store.create(job_id, {
+        "status": "in_progress",
+        "result": None,
+        "events": [{
+            "timestamp": datetime.now().isoformat(),
+            "data": "Job started"
+        }]
+    })
+    return (
+        job_id, data['location'], data['cities'],
+        data['date_range'], data['interests'], cache_key,
+        data.get('prompt_profile', DEFAULT_PROFILE),
+        time.monotonic()
+    )
+
+def _abandon_job(job_id, cache_key, error):
+    job_store.delete(job_id)
+    if cache_key is not None:
+        result_cache.release(cache_key, job_id)
+    logging.warning(f"Rejected trip planning request: {error}")
+    JOBS.inc(outcome="rejected")
+
+def _rejection(error):
+    status_code = 429 if isinstance(error, QueueFullError) else 503
+    return {"error": str(error)}, status_code, {"Retry-After": str(QUEUE_RETRY_AFTER)}
+
+def submit_trip(data):
+    """Validate a trip request and start (or reuse) a job for it."""
+    logging.info(f"Received trip planning request: {data}")
+    error = validate_trip(data)
+    if error is not None:
+        return {"error": error}, 400, {}
+
+    cache_key = _request_cache_key(data)
+    job_id = str(uuid4())
+    reused = _reuse_trip(job_id, cache_key)
+    if reused is not None:
+        return reused
+
+    try:
+        queue_position = scheduler.submit(
+            job_id, kickoff_trip_planning, *_create_job(job_id, data, cache_key),
+            priority=data.get('priority', 0)
+        )
+    except (QueueFullError, SchedulerClosedError) as e:
+        _abandon_job(job_id, cache_key, e)
+        return _rejection(e)
+
+    return {
+        "job_id": job_id,
+        "status": "Trip planning started",
+        "message": "Successfully initiated trip planning",
+        "queue_position": queue_position
+    }, 202, {}
+
+def parse_batch(body, content_type):
+    """Trip requests from a JSON array or an NDJSON body.
+
+    Returns ``(trips, error)``; ``error`` is None when the body parsed.
+    """
+    try:
+        text = body.decode("utf-8")
+        if "ndjson" in content_type or "jsonl" in content_type:
+            return [json.loads(line) for line in text.splitlines() if line.strip()], None
+        return json.loads(text or "null"), None
+    except ValueError as e:
+        return None, f"Invalid batch body: {e}"
+
+def submit_batch(trips):
+    """Validate a batch of trip requests and start a job per distinct request.
+
+    Every request is validated before any job is scheduled, identical
+    requests share one job, and the new jobs are admitted to the queue
+    together or not at all. Items run at BATCH_PRIORITY or a lower priority
+    they ask for, never higher, so bulk work queues behind interactive
+    requests.
+    """
+    if not isinstance(trips, list) or not trips:
+        return {"error": "Batch must be a non-empty JSON array or NDJSON stream "
+                         "of trip requests"}, 400, {}
+    if len(trips) > BATCH_MAX_ITEMS:
+        return {"error": f"Batch has {len(trips)} requests, "
+                         f"at most {BATCH_MAX_ITEMS} are accepted"}, 413, {}
+    logging.info(f"Received batch of {len(trips)} trip planning requests")
+
+    items = []
+    first_index = {}
+    new_jobs = []
+    for index, data in enumerate(trips):
+        error = validate_trip(data)
+        if error is not None:
+            items.append({"index": index, "status": "invalid", "error": error})
+            continue
+        cache_key = _request_cache_key(data)
+        dedupe_key = cache_key or json.dumps(data, sort_keys=True)
+        if dedupe_key in first_index:
+            first = first_index[dedupe_key]
+            items.append(dict(items[first], index=index, duplicate_of=first))
+            continue
+        first_index[dedupe_key] = index
+        items.append({"index": index, "data": data, "cache_key": cache_key})
+
+    # Serve what the result cache or in-flight jobs already cover
+    for item in items:
+        if "data" not in item or "duplicate_of" in item:
+            continue
+        job_id = str(uuid4())
+        reused = _reuse_trip(job_id, item["cache_key"])
+        if reused is not None:
+            payload, _, _ = reused
+            item.update(job_id=payload["job_id"],
+                        status="cached" if payload.get("cached") else "coalesced")
+        else:
+            item.update(job_id=job_id, status="queued")
+            new_jobs.append(item)
+
+    if new_jobs:
+        jobs = [
+            (item["job_id"], kickoff_trip_planning,
+             _create_job(item["job_id"], item["data"], item["cache_key"]),
+             max(BATCH_PRIORITY, item["data"].get("priority", BATCH_PRIORITY)))
+            for item in new_jobs
+        ]
+        try:
+            positions = scheduler.submit_many(jobs)
+        except (QueueFullError, SchedulerClosedError) as e:
+            for item in new_jobs:
+                _abandon_job(item["job_id"], item["cache_key"], e)
+            return _rejection(e)
+        for item, position in zip(new_jobs, positions):
+            item["queue_position"] = position
+
+    for item in items:
+        if "duplicate_of" in item:
+            original = items[item["duplicate_of"]]
+            item.update(
+                (name, original[name]) for name in ("job_id", "status", "queue_position")
+                if name in original)
+        item.pop("data", None)
+        item.pop("cache_key", None)
+
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    if counts.keys() == {"invalid"}:
+        return {"error": "No valid trip requests in the batch", "items": items}, 400, {}
+
+    batch_id = str(uuid4())
+    batch_store.create(batch_id, {
+        "status": "accepted", "result": None, "items": items})
+    return {
+        "batch_id": batch_id,
+        "status_url": f"/api/crew/batch/{batch_id}",
+        "counts": counts,
+        "items": items
+    }, 202, {}
+
+def batch_items(batch_id):
+    """Items of a batch as returned by submit_batch, None if it is unknown."""
+    batch = batch_store.get(batch_id, since=BATCH_NO_EVENTS)
+    return None if batch is None else batch["items"]
+
+def batch_step(items, pending):
+    """One poll of a batch for its NDJSON status stream.
+
+    ``pending`` holds the indices of the items not sent yet. Returns an
+    NDJSON line per item that finished since the last step (removing it
+    from ``pending``), like stream_step leaving the sleeping to the caller.
+    """
+    jobs = {}
+    lines = []
+    for index in sorted(pending):
+        item = items[index]
+        job_id = item.get("job_id")
+        if job_id is None:
+            line = item
+        else:
+            if job_id not in jobs:
+                jobs[job_id] = get_job(job_id, since=BATCH_NO_EVENTS)
+            job = jobs[job_id]
+            if job is not None and job["status"] == "in_progress":
+                continue
+            line = {"index": index, "job_id": job_id}
+            if "duplicate_of" in item:
+                line["duplicate_of"] = item["duplicate_of"]
+            if job is None:
+                line.update(status="error", error="Job not found")
+            else:
+                line.update(
+                    status=job["status"],
+                    result=job["result"],
+                    itinerary=job.get("itinerary"),
+                    usage=job.get("usage"))
+        pending.discard(index)
+        lines.append(json.dumps(line) + "\n")
+    return lines
+
+def get_job(job_id, since=0):
+    """Snapshot of a job for the status routes, None if there is no such job.
+
+    Job ids are UUIDs; an id with a ':' is refused without a lookup, so the
+    status routes only ever serve job records.
+    """
+    if ":" in job_id:
+        return None
+    return job_store.get(job_id, since=since)
+
+def _int_arg(args, name, default):
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def job_status(job_id, args):
+    """Status of a job; ``args`` is the query string as a mapping of strings.
+
+    Supports incremental polling (`since`), the structured itinerary
+    view (`fields`, `day_offset`, `day_limit`) and, while the itinerary is
+    being written, its paragraphs from index `partial_since` on.
+    """
+    # Incremental polling: only events from index `since` on are returned
+    since = _int_arg(args, 'since', 0)
+    if since < 0:
+        return {"error": "since must be a non-negative integer"}, 400, {}
+
+    # Structured view: ?fields=days,budget returns only those itinerary
+    # fields instead of the full text, ?day_offset/day_limit page the days
+    fields = args.get('fields')
+    if fields is not None:
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in ITINERARY_FIELDS]
+        if unknown:
+            return {
+                "error": f"Unknown itinerary fields: {', '.join(unknown)}. "
+                         f"Expected any of: {', '.join(ITINERARY_FIELDS)}"
+            }, 400, {}
+    partial_since = _int_arg(args, 'partial_since', 0)
+    if partial_since < 0:
+        return {"error": "partial_since must be a non-negative integer"}, 400, {}
+    day_offset = _int_arg(args, 'day_offset', 0)
+    day_limit = _int_arg(args, 'day_limit', None)
+    if day_offset < 0 or (day_limit is not None and day_limit < 0):
+        return {"error": "day_offset and day_limit must be non-negative integers"}, 400, {}
+
+    # Snapshot of the job; serialization happens outside any store lock
+    job = get_job(job_id, since=since)
+
+    if job is None:
+        logging.warning(f"Job {job_id} not found")
+        return {"error": "Job not found"}, 404, {}
+
+    logging.debug(f"Job {job_id} is {job['status']} with {job['event_count']} events")
+
+    response_data = {
+        "job_id": job_id,
+        "status": job["status"],
+        "result": job["result"],  # Result is already cleaned when stored
+        "events": job["events"],
+        "next_event_index": since + len(job["events"]),
+        "queue_position": scheduler.queue_position(job_id),
+        # Prompt vs completion tokens, once the job completed
+        "usage": job.get("usage"),
+        # Queue wait, per-task and per-tool time; updated as tasks finish
+        "timings": job.get("timings"),
+        # Cleaned itinerary text streamed so far; None once the result is in
+        "partial": _partial_view(job.get("partial"), partial_since)
+    }
+
+    if fields is not None or 'day_offset' in args or 'day_limit' in args:
+        del response_data["result"]
+        itinerary = job.get("itinerary")
+        if itinerary is not None:
+            itinerary = Itinerary.from_dict(itinerary)
+            response_data["days_total"] = len(itinerary.days)
+            response_data["itinerary"] = itinerary.to_dict(
+                fields or None, day_offset=day_offset, day_limit=day_limit)
+        else:
+            response_data["itinerary"] = None
+
+    return response_data, 200, {}
+
+def _partial_view(partial, since):
+    """Paragraphs of a partial result from index ``since`` on."""
+    if partial is None or since <= partial["first_paragraph"]:
+        return partial
+    skip = since - partial["first_paragraph"]
+    return dict(partial, paragraphs=partial["paragraphs"][skip:], first_paragraph=since)
+
+def sse(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def stream_cursor(args, headers):
+    """First event index to stream, from Last-Event-ID or `?since=`."""
+    since = _int_arg(args, 'since', 0)
+    last_event_id = headers.get('Last-Event-ID')
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id) + 1
+    return max(since, 0)
+
+def stream_step(job_id, cursor):
+    """One poll of a job for the SSE stream.
+
+    Returns the SSE messages to send, the new cursor and whether the
+    stream is finished. Callers sleep STREAM_POLL_INTERVAL between steps
+    in whatever way suits their server.
+    """
+    job = get_job(job_id, since=cursor)
+    if job is None:
+        return [sse("error", {"error": "Job not found"})], cursor, True
+    messages = []
+    for event in job["events"]:
+        messages.append(sse("progress", event, event_id=cursor))
+        cursor += 1
+    if job["status"] != "in_progress":
+        messages.append(sse("result", {
+            "job_id": job_id,
+            "status": job["status"],
+            "result": job["result"]
+        }))
+        return messages, cursor, True
+    return messages, cursor, False
+
+# SSE comment line keeps proxies from closing an idle stream
+SSE_KEEP_ALIVE = ": keep-alive\n\n"
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+# A blank line keeps an idle NDJSON batch stream open; NDJSON readers skip it
+NDJSON_KEEP_ALIVE = "\n"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"